@@ -0,0 +1,505 @@
+import argparse
+import asyncio
+import json
+import re
+import signal
+from http import HTTPStatus
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from assistant.contacts import ContactsBook
+from assistant.error_handler import (
+    _AssistantError,
+    EmailIsExistError,
+    EmptyContactsError,
+    EmptyNotesError,
+    InvalidNoteOrContactIDError,
+    NameIsExistError,
+    NoResultsFoundError,
+    PhoneIsExistError,
+    TagIsPresentError,
+)
+from assistant.main import get_storage_options
+from assistant.notes import NotesManager
+
+HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+MAX_BODY_SIZE = 1024 * 1024
+MAX_HEADERS = 100
+
+
+class _HttpError(Exception):
+    """
+    Raised for requests which can not be served, carrying the HTTP status of the response.
+    """
+
+    def __init__(self, status: HTTPStatus, message: str = None):
+        """
+        Initializes a new _HttpError instance.
+
+        Parameters:
+        status (HTTPStatus): The status of the response.
+        message (str, optional): The error message. Defaults to the phrase of the status.
+        """
+        super().__init__(message or status.phrase)
+        self.status = status
+
+
+class _Route:
+    """
+    A route of the API: a method and a path pattern mapped to a handler.
+
+    Attributes:
+        method (str): The HTTP method.
+        pattern (re.Pattern): The pattern of the path. Its named groups are passed to the handler.
+        handler (str): The name of the AssistantApi method serving the route.
+        mutating (bool): Whether the handler changes the data and has to go through the writer task.
+    """
+
+    def __init__(self, method: str, path: str, handler: str, mutating: bool = False):
+        """
+        Initializes a new _Route instance.
+
+        Parameters:
+        method (str): The HTTP method.
+        path (str): The path with placeholders in braces, e.g. '/contacts/{id}'.
+        handler (str): The name of the AssistantApi method serving the route.
+        mutating (bool, optional): Whether the handler changes the data. Defaults to False.
+        """
+        self.method = method
+        self.pattern = re.compile("^" + re.sub(r"{(\w+)}", r"(?P<\1>[^/]+)", path) + "$")
+        self.handler = handler
+        self.mutating = mutating
+
+
+class AssistantApi:
+    """
+    A local HTTP/JSON server over the contacts book and the notes manager.
+
+    The server speaks HTTP/1.1 with keep-alive and serves pipelined requests of a connection in order. Reads are
+    answered directly on the event loop. Mutations are queued to a single writer task, which applies them one
+    by one, persists a whole batch of them with a single flush and only then completes the requests, so the
+    storages are never changed concurrently and every answered change is on disk.
+
+    Every response is a JSON object: {"result": ...} on success, {"error": "..."} otherwise.
+
+    Attributes:
+        ROUTES (list[_Route]): The routes of the API. Handlers take the path values, the query parameters and
+            the JSON body of the request.
+        CONTACT_EDITS (tuple[str]): The contact fields which can be updated, in the order of the updates.
+        contacts (ContactsBook): The opened contacts book.
+        notes (NotesManager): The opened notes manager.
+        port (int): The port the server listens on.
+        _mutations (asyncio.Queue): The queue of the writer task.
+    """
+
+    ROUTES = [
+        _Route("GET", "/contacts", "get_contacts"),
+        _Route("POST", "/contacts", "post_contact", mutating=True),
+        _Route("PATCH", "/contacts/{id}", "patch_contact", mutating=True),
+        _Route("DELETE", "/contacts/{id}", "delete_contact", mutating=True),
+        _Route("GET", "/birthdays", "get_birthdays"),
+        _Route("GET", "/notes", "get_notes"),
+        _Route("POST", "/notes", "post_note", mutating=True),
+        _Route("PATCH", "/notes/{id}", "patch_note", mutating=True),
+        _Route("DELETE", "/notes/{id}", "delete_note", mutating=True),
+        _Route("POST", "/notes/{id}/tags", "post_note_tag", mutating=True),
+        _Route("PUT", "/notes/{id}/tags/{tag}", "put_note_tag", mutating=True),
+        _Route("DELETE", "/notes/{id}/tags/{tag}", "delete_note_tag", mutating=True),
+    ]
+
+    CONTACT_EDITS = ("name", "phone", "email", "birthday", "address")
+
+    def __init__(self, contacts: ContactsBook, notes: NotesManager, port: int = DEFAULT_PORT):
+        """
+        Initializes a new AssistantApi instance.
+
+        Parameters:
+        contacts (ContactsBook): The opened contacts book. It should use the "exit" write policy.
+        notes (NotesManager): The opened notes manager. It should use the "exit" write policy.
+        port (int, optional): The port to listen on. Defaults to DEFAULT_PORT.
+        """
+        self.contacts = contacts
+        self.notes = notes
+        self.port = port
+        self._mutations = None
+
+    @staticmethod
+    def _to_json(elements: list):
+        """
+        Converts records to JSON objects.
+
+        Parameters:
+        elements (list): The records, or dictionaries which are kept as they are.
+
+        Returns:
+        list[dict]: The JSON objects.
+        """
+        return [
+            element if isinstance(element, dict)
+            else {field: getattr(element, field) for field in element.FIELDS}
+            for element in elements
+        ]
+
+    @staticmethod
+    def _require(body: dict, key: str):
+        """
+        Gets a required string value from the request body.
+
+        Parameters:
+        body (dict): The request body.
+        key (str): The key of the value.
+
+        Returns:
+        str: The value.
+
+        Raises:
+        _HttpError: If the value is missing or is not a string.
+        """
+        value = body.get(key)
+        if not isinstance(value, str):
+            raise _HttpError(HTTPStatus.BAD_REQUEST, f"Error: The '{key}' string is required.")
+        return value
+
+    def get_contacts(self, params: dict, query: dict, body: dict):
+        """
+        Lists all the contacts, the contacts matching the 'criteria' and 'value' query parameters, or the contacts
+        with a name similar to the 'fuzzy' query parameter, the closest first.
+        """
+        if "fuzzy" in query:
+            return self._to_json(self.contacts.fuzzy_find_contacts(query["fuzzy"]))
+        if "criteria" in query:
+            return self._to_json(
+                self.contacts.find_contacts(query["criteria"], query.get("value", ""))
+            )
+        return self._to_json(self.contacts.show_contacts())
+
+    def post_contact(self, params: dict, query: dict, body: dict):
+        """
+        Adds a contact from the 'name', 'phone' and optional 'email', 'birthday' and 'address' body values.
+        """
+        details = [
+            self._require(body, key) if key in body else ""
+            for key in ("email", "birthday", "address")
+        ]
+        return self.contacts.add_contact(
+            self._require(body, "name"), self._require(body, "phone"), *details
+        )
+
+    def patch_contact(self, params: dict, query: dict, body: dict):
+        """
+        Updates the contact fields given in the body. All the values are checked first, so nothing is changed
+        if any of them is rejected.
+        """
+        edits = {field: self._require(body, field) for field in self.CONTACT_EDITS if field in body}
+        if not edits:
+            raise _HttpError(HTTPStatus.BAD_REQUEST, "Error: No contact field to update.")
+        self.contacts.check_edits(params["id"], edits)
+        return [getattr(self.contacts, "edit_" + field)(params["id"], value) for field, value in edits.items()]
+
+    def delete_contact(self, params: dict, query: dict, body: dict):
+        """
+        Deletes a contact.
+        """
+        return self.contacts.delete_contact(params["id"])
+
+    def get_birthdays(self, params: dict, query: dict, body: dict):
+        """
+        Lists the birthdays within the number of days given by the 'days' query parameter.
+        """
+        return self.contacts.show_birthdays(query.get("days", ""))
+
+    def get_notes(self, params: dict, query: dict, body: dict):
+        """
+        Lists all the notes, or the notes matching the 'tag' or the 'keyword' query parameter.
+        """
+        if "tag" in query:
+            return self._to_json(self.notes.find_notes_by_tag(query["tag"]))
+        if "keyword" in query:
+            return self._to_json(self.notes.find_notes(query["keyword"]))
+        return self._to_json(self.notes.show_notes())
+
+    def post_note(self, params: dict, query: dict, body: dict):
+        """
+        Adds a note with the 'content' body value.
+        """
+        return self.notes.add_note(self._require(body, "content"))
+
+    def patch_note(self, params: dict, query: dict, body: dict):
+        """
+        Replaces the content of a note with the 'content' body value.
+        """
+        return self.notes.edit_note(params["id"], self._require(body, "content"))
+
+    def delete_note(self, params: dict, query: dict, body: dict):
+        """
+        Deletes a note.
+        """
+        return self.notes.delete_note(params["id"])
+
+    def post_note_tag(self, params: dict, query: dict, body: dict):
+        """
+        Adds the 'tag' body value to the tags of a note.
+        """
+        return self.notes.add_note_tag(params["id"], self._require(body, "tag"))
+
+    def put_note_tag(self, params: dict, query: dict, body: dict):
+        """
+        Replaces a tag of a note with the 'tag' body value.
+        """
+        return self.notes.edit_note_tag(params["id"], params["tag"], self._require(body, "tag"))
+
+    def delete_note_tag(self, params: dict, query: dict, body: dict):
+        """
+        Deletes a tag of a note.
+        """
+        return self.notes.delete_note_tag(params["id"], params["tag"])
+
+    def _call(self, handler: str, params: dict, query: dict, body: dict):
+        """
+        Calls a handler and converts its result or error to a response.
+
+        Parameters:
+        handler (str): The name of the handler.
+        params (dict): The values taken from the path.
+        query (dict): The query parameters.
+        body (dict): The JSON body of the request.
+
+        Returns:
+        tuple[HTTPStatus, dict]: The status and the body of the response.
+        """
+        try:
+            return HTTPStatus.OK, {"result": getattr(self, handler)(params, query, body)}
+        except (NoResultsFoundError, EmptyContactsError, EmptyNotesError):
+            return HTTPStatus.OK, {"result": []}
+        except InvalidNoteOrContactIDError as e:
+            return HTTPStatus.NOT_FOUND, {"error": str(e)}
+        except (NameIsExistError, PhoneIsExistError, EmailIsExistError, TagIsPresentError) as e:
+            return HTTPStatus.CONFLICT, {"error": str(e)}
+        except _HttpError as e:
+            return e.status, {"error": str(e)}
+        except (_AssistantError, ValueError) as e:
+            return HTTPStatus.BAD_REQUEST, {"error": str(e)}
+        except Exception as e:
+            return HTTPStatus.INTERNAL_SERVER_ERROR, {"error": f"An unexpected error occurred: {e}"}
+
+    async def _write_mutations(self):
+        """
+        The writer task: applies the queued mutations and persists every batch of them with a single flush.
+
+        If the flush fails, every request of the batch is answered with the error and the task goes on serving.
+        The changes stay applied in memory and staged in the storages, which write them again with the next
+        flush: the next batch of mutations or the shutdown of the server.
+        """
+        while True:
+            batch = [await self._mutations.get()]
+            while not self._mutations.empty():
+                batch.append(self._mutations.get_nowait())
+            try:
+                results = [self._call(*call) for call, _ in batch]
+                self.contacts.flush()
+                self.notes.flush()
+            except Exception as e:
+                error = {"error": f"Error: The changes could not be saved yet, they are kept to be saved again: {e}"}
+                results = [(HTTPStatus.INTERNAL_SERVER_ERROR, error)] * len(batch)
+            for (_, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+
+    async def dispatch(self, method: str, target: str, body: bytes):
+        """
+        Serves a single request.
+
+        Parameters:
+        method (str): The HTTP method.
+        target (str): The request target (path and query).
+        body (bytes): The request body.
+
+        Returns:
+        tuple[HTTPStatus, dict]: The status and the body of the response.
+        """
+        url = urlsplit(target)
+        path = unquote(url.path).rstrip("/") or "/"
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        allowed = False
+        for route in self.ROUTES:
+            match = route.pattern.match(path)
+            if not match:
+                continue
+            allowed = True
+            if route.method != method:
+                continue
+            try:
+                data = json.loads(body) if body else {}
+            except ValueError:
+                return HTTPStatus.BAD_REQUEST, {"error": "Error: The body is not valid JSON."}
+            if not isinstance(data, dict):
+                return HTTPStatus.BAD_REQUEST, {"error": "Error: The body must be a JSON object."}
+            call = (route.handler, match.groupdict(), query, data)
+            if not route.mutating:
+                return self._call(*call)
+            future = asyncio.get_running_loop().create_future()
+            await self._mutations.put((call, future))
+            return await future
+        if allowed:
+            return HTTPStatus.METHOD_NOT_ALLOWED, {"error": HTTPStatus.METHOD_NOT_ALLOWED.phrase}
+        return HTTPStatus.NOT_FOUND, {"error": HTTPStatus.NOT_FOUND.phrase}
+
+    @staticmethod
+    async def _read_request(reader: asyncio.StreamReader):
+        """
+        Reads a request from the connection.
+
+        Parameters:
+        reader (asyncio.StreamReader): The stream of the connection.
+
+        Returns:
+        tuple[str, str, dict, bytes] | None: The method, the target, the lowercased headers and the body,
+        or None if the client closed the connection.
+
+        Raises:
+        _HttpError: If the request is malformed or too large.
+        """
+        request_line = await reader.readline()
+        if not request_line.strip():
+            return None
+        try:
+            method, target, version = request_line.decode("latin-1").split()
+        except ValueError:
+            raise _HttpError(HTTPStatus.BAD_REQUEST)
+        headers = {"": version}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            if len(headers) > MAX_HEADERS:
+                raise _HttpError(HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE)
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+        if "chunked" in headers.get("transfer-encoding", ""):
+            raise _HttpError(HTTPStatus.LENGTH_REQUIRED)
+        try:
+            length = int(headers.get("content-length", 0))
+        except ValueError:
+            raise _HttpError(HTTPStatus.BAD_REQUEST)
+        if length > MAX_BODY_SIZE:
+            raise _HttpError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE)
+        body = await reader.readexactly(length) if length > 0 else b""
+        return method.upper(), target, headers, body
+
+    def _check_headers(self, headers: dict, body: bytes):
+        """
+        Rejects requests which a web page may have sent through the browser of the user.
+
+        The Host header has to name localhost with the port of the API, which defeats DNS rebinding, and a
+        body has to be declared as JSON, which a cross-site form or a "simple" cross-site request can not do
+        without the consent of the API.
+
+        Parameters:
+        headers (dict): The lowercased request headers.
+        body (bytes): The request body.
+
+        Raises:
+        _HttpError: If the Host or the Content-Type header is not accepted.
+        """
+        hosts = {f"{HOST}:{self.port}", f"localhost:{self.port}"}
+        if self.port == 80:
+            hosts |= {HOST, "localhost"}
+        if headers.get("host", "").lower() not in hosts:
+            raise _HttpError(HTTPStatus.FORBIDDEN, "Error: The Host header must be localhost with the API port.")
+        if body and headers.get("content-type", "").partition(";")[0].strip().lower() != "application/json":
+            raise _HttpError(HTTPStatus.UNSUPPORTED_MEDIA_TYPE, "Error: The body must be sent as application/json.")
+
+    @staticmethod
+    def _keep_alive(headers: dict):
+        """
+        Checks whether the connection is kept open after the response.
+
+        Parameters:
+        headers (dict): The lowercased request headers with the HTTP version under the empty key.
+
+        Returns:
+        bool: True for HTTP/1.1 without 'Connection: close' and HTTP/1.0 with 'Connection: keep-alive'.
+        """
+        connection = headers.get("connection", "").lower()
+        if headers[""] == "HTTP/1.0":
+            return connection == "keep-alive"
+        return connection != "close"
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """
+        Serves the requests of a connection in order until it is closed.
+
+        Parameters:
+        reader (asyncio.StreamReader): The stream of the requests.
+        writer (asyncio.StreamWriter): The stream of the responses.
+        """
+        try:
+            keep_alive = True
+            while keep_alive:
+                try:
+                    request = await self._read_request(reader)
+                except _HttpError as e:
+                    status, response, keep_alive = e.status, {"error": str(e)}, False
+                else:
+                    if request is None:
+                        break
+                    method, target, headers, body = request
+                    keep_alive = self._keep_alive(headers)
+                    try:
+                        self._check_headers(headers, body)
+                    except _HttpError as e:
+                        status, response = e.status, {"error": str(e)}
+                    else:
+                        status, response = await self.dispatch(method, target, body)
+                payload = json.dumps(response).encode()
+                writer.write(
+                    (
+                        f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+                        "Content-Type: application/json\r\n"
+                        f"Content-Length: {len(payload)}\r\n"
+                        f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+                    ).encode("latin-1")
+                    + payload
+                )
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.LimitOverrunError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self):
+        """
+        Listens on localhost until a SIGINT/SIGTERM signal arrives.
+        """
+        stopped = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, stopped.set)
+        self._mutations = asyncio.Queue()
+        writer_task = asyncio.create_task(self._write_mutations())
+        server = await asyncio.start_server(self.handle_connection, HOST, self.port)
+        try:
+            async with server:
+                await stopped.wait()
+        finally:
+            writer_task.cancel()
+
+
+def run_api():
+    """
+    Runs the HTTP/JSON API server in the foreground.
+    """
+    parser = argparse.ArgumentParser(
+        prog="personal-assistant-api",
+        description="Serves the contacts and the notes as a JSON API on localhost.",
+    )
+    parser.add_argument(
+        "--port", type=int, default=DEFAULT_PORT, help=f"the port to listen on (default: {DEFAULT_PORT})"
+    )
+    options = parser.parse_args()
+
+    storage_options = get_storage_options()
+    with ContactsBook(write_policy="exit", **storage_options) as contacts, NotesManager(
+        write_policy="exit", **storage_options
+    ) as notes:
+        asyncio.run(AssistantApi(contacts, notes, options.port).serve())
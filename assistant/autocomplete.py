@@ -4,6 +4,8 @@ from prompt_toolkit.key_binding import KeyBindings
 from prompt_toolkit.keys import Keys
 from prompt_toolkit.document import Document
 
+COMPLETION_LIMIT = 20
+
 
 class SpaceAwareCompleter(Completer):
     """
@@ -37,12 +39,61 @@ class SpaceAwareCompleter(Completer):
         yield from self.word_completer.get_completions(document, complete_event)
 
 
+class ArgumentCompleter(SpaceAwareCompleter):
+    """
+    A custom completer that completes the command names, and the arguments of the commands after a space.
+
+    The arguments are completed by a callback, which looks them up in the stored data, e.g. contact names or
+    tags. Only the first COMPLETION_LIMIT matches are requested, so the completion takes the same time for
+    any number of stored records.
+
+    Attributes:
+        word_completer (Completer): The completer used for the command names.
+        complete_argument (Callable): Gets the completions of an argument as (text, display, meta) tuples from
+            the command, the preceding arguments, the typed prefix and the maximal number of completions.
+    """
+
+    def __init__(self, word_completer, complete_argument):
+        """
+        Initializes the ArgumentCompleter with a word completer and an argument completion callback.
+
+        Parameters:
+            word_completer (Completer): The completer to use for the command names.
+            complete_argument (Callable): The callback providing the completions of the arguments.
+        """
+        super().__init__(word_completer)
+        self.complete_argument = complete_argument
+
+    def get_completions(self, document, complete_event):
+        """
+        Overrides the get_completions method to provide completions.
+
+        Before the first space the command name is completed, afterwards the argument under the cursor.
+
+        Parameters:
+            document (Document): The current document/input where completion is being performed.
+            complete_event (CompleteEvent): The completion event triggering this method.
+        """
+        text = document.text_before_cursor
+        if " " not in text:
+            yield from self.word_completer.get_completions(document, complete_event)
+            return
+        words = text.split()
+        prefix = "" if text[-1].isspace() else words.pop()
+        if not words:
+            return
+        for completion, display, meta in self.complete_argument(
+            words[0].lower(), words[1:], prefix, COMPLETION_LIMIT
+        ):
+            yield Completion(completion, start_position=-len(prefix), display=display, display_meta=meta)
+
+
 class AutoCompleter:
     """
     A class to facilitate auto-completion in a command-line interface with custom behavior.
 
-    This class sets up a prompt session with a custom completer that stops suggesting completions
-    after a space is entered, along with custom key bindings.
+    This class sets up a prompt session with a custom completer, along with custom key bindings. Without an
+    argument completion callback the completer stops suggesting completions after a space is entered.
 
     Attributes:
         command_list (list): A list of commands for auto-completion.
@@ -51,16 +102,21 @@ class AutoCompleter:
         bindings (KeyBindings): Custom key bindings for the prompt session.
     """
 
-    def __init__(self, command_list):
+    def __init__(self, command_list, complete_argument=None):
         """
         Initializes the AutoCompleter with a list of commands.
 
         Parameters:
             command_list (list): A list of commands to be used for auto-completion.
+            complete_argument (Callable, optional): The callback providing the completions of the command
+                arguments (see ArgumentCompleter). Defaults to no argument completion.
         """
         self.command_list = command_list
         word_completer = WordCompleter(command_list, ignore_case=True)
-        self.custom_completer = SpaceAwareCompleter(word_completer)
+        if complete_argument is None:
+            self.custom_completer = SpaceAwareCompleter(word_completer)
+        else:
+            self.custom_completer = ArgumentCompleter(word_completer, complete_argument)
         self.bindings = self._setup_key_bindings()
         self.session = PromptSession(
             completer=self.custom_completer, key_bindings=self.bindings
@@ -0,0 +1,181 @@
+import argparse
+import json
+import shlex
+import socket
+import sys
+from pathlib import Path
+
+SOCKET_FILENAME = "assistant.sock"
+RESPONSE_LIMIT = 64 * 1024 * 1024
+
+
+def get_socket_path():
+    """
+    Gets the default path of the Unix domain socket the assistant daemon listens on.
+
+    Returns:
+    Path: The path of the socket in the assistant data directory.
+    """
+    return Path.home().resolve() / ".assistant" / SOCKET_FILENAME
+
+
+class AssistantClient:
+    """
+    A thin client sending commands to the assistant daemon over its Unix domain socket.
+
+    Every request and every response is a single line of JSON. The client only depends on the standard library
+    and does not load the storage, so an invocation costs a connection instead of loading all the data.
+
+    Attributes:
+        socket_path (Path): The path of the socket the daemon listens on.
+        _socket (socket.socket): The connection to the daemon, opened by connect().
+        _reader: The file object reading the responses from the connection.
+    """
+
+    def __init__(self, socket_path: Path = None):
+        """
+        Initializes a new AssistantClient instance.
+
+        Parameters:
+        socket_path (Path, optional): The path of the daemon socket. Defaults to the socket in the data directory.
+        """
+        self.socket_path = socket_path or get_socket_path()
+        self._socket = None
+        self._reader = None
+
+    def connect(self):
+        """
+        Connects to the daemon.
+
+        Raises:
+        OSError: If the daemon is not running.
+        """
+        self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            self._socket.connect(str(self.socket_path))
+        except OSError:
+            self._socket.close()
+            self._socket = None
+            raise
+        self._reader = self._socket.makefile("rb")
+
+    def close(self):
+        """
+        Closes the connection to the daemon.
+        """
+        if self._socket:
+            self._reader.close()
+            self._socket.close()
+            self._socket = None
+
+    def __enter__(self):
+        self.connect()
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+    def request(self, request: dict):
+        """
+        Sends a request to the daemon and waits for its response.
+
+        Parameters:
+        request (dict): The request, e.g. {"args": ["show-contacts"]}.
+
+        Returns:
+        dict: The response with the 'stdout', 'stderr' and 'status' keys.
+
+        Raises:
+        ConnectionError: If the daemon closed the connection.
+        """
+        self._socket.sendall(json.dumps(request).encode() + b"\n")
+        line = self._reader.readline(RESPONSE_LIMIT)
+        if not line:
+            raise ConnectionError("The assistant daemon closed the connection.")
+        return json.loads(line)
+
+    def execute(self, args: list):
+        """
+        Executes a command in the daemon.
+
+        Parameters:
+        args (list[str]): The command and its arguments.
+
+        Returns:
+        dict: The response with the 'stdout', 'stderr' and 'status' keys.
+        """
+        return self.request({"args": args})
+
+    def shutdown(self):
+        """
+        Asks the daemon to persist its data and stop.
+
+        Returns:
+        dict: The response of the daemon.
+        """
+        return self.request({"shutdown": True})
+
+
+def _split_lines(lines):
+    """
+    Splits lines of commands like in a shell.
+
+    A line which can not be split, e.g. because of an unbalanced quote, is reported on the standard error
+    stream like in batch mode, and the following lines are still read.
+
+    Parameters:
+    lines (Iterable[str]): The lines, e.g. the standard input.
+
+    Yields:
+    list[str] | None: The command with its arguments, or None for a line which can not be split.
+    """
+    for number, line in enumerate(lines, 1):
+        try:
+            yield shlex.split(line)
+        except ValueError as e:
+            sys.stderr.write(f"Error: Line {number} can not be parsed: {e}.\n")
+            yield None
+
+
+def run_client():
+    """
+    Runs a command in the assistant daemon and prints its output.
+
+    Without a command, the commands are read from the standard input, one per line, split like in a shell.
+    The exit status is 0 if all the commands succeeded, 1 if any of them failed and 2 if the daemon is not running.
+    """
+    parser = argparse.ArgumentParser(
+        prog="personal-assistant-client",
+        description="Sends commands to a running personal-assistant-daemon.",
+    )
+    parser.add_argument("--socket", type=Path, help="the path of the daemon socket")
+    parser.add_argument("--stop", action="store_true", help="stop the daemon")
+    parser.add_argument("command", nargs=argparse.REMAINDER, help="the command with its arguments")
+    options = parser.parse_args()
+
+    status = 0
+    try:
+        with AssistantClient(options.socket) as client:
+            if options.stop:
+                client.shutdown()
+                return
+            if options.command:
+                commands = [options.command]
+            else:
+                commands = _split_lines(sys.stdin)
+            for args in commands:
+                if args is None:
+                    status = 1
+                    continue
+                if not args or args[0].startswith("#"):
+                    continue
+                response = client.execute(args)
+                sys.stdout.write(response["stdout"])
+                sys.stderr.write(response["stderr"])
+                status = max(status, response["status"])
+    except (FileNotFoundError, ConnectionRefusedError):
+        sys.stderr.write(
+            "Error: The assistant daemon is not running. Start it with 'personal-assistant-daemon'.\n"
+        )
+        sys.exit(2)
+    sys.exit(status)
@@ -0,0 +1,322 @@
+class Command:
+    """
+    A class describing a command of the assistant.
+
+    The command registry is the single source for the dispatch of commands, the help table and the
+    autocompletion of command names and arguments.
+
+    Attributes:
+        name (str): The name of the command typed by the user.
+        handler (str): The name of the Assistant method executing the command, or None for commands ending the session.
+        arguments (str): The description of the arguments shown in the help.
+        description (str): The description of the command shown in the help.
+        min_args (int): The minimal number of arguments.
+        max_args (int): The maximal number of arguments, or None if it is not limited.
+        output (str): How the result is printed: 'info' for messages, 'table' for lists of records,
+            'exit' for commands ending the session.
+        completions (tuple): The completion kind of every argument, one of COMPLETION_KINDS or None: 'contact'
+            for a contact ID (completed from the IDs and the names), 'criteria' for a contact search criteria,
+            'tag' for any tag in use and 'note-tag' for a tag of the note given by the first argument.
+    """
+
+    OUTPUT_KINDS = ("info", "table", "exit")
+    COMPLETION_KINDS = ("contact", "criteria", "tag", "note-tag")
+
+    def __init__(
+        self,
+        name: str,
+        handler: str,
+        arguments: str,
+        description: str,
+        arity: tuple = (0, None),
+        output: str = "info",
+        completions: tuple = (),
+    ):
+        """
+        Initializes a new Command instance.
+
+        Parameters:
+        name (str): The name of the command typed by the user.
+        handler (str): The name of the Assistant method executing the command.
+        arguments (str): The description of the arguments shown in the help.
+        description (str): The description of the command shown in the help.
+        arity (tuple, optional): The minimal and the maximal number of arguments. None means no limit.
+        output (str, optional): How the result is printed: 'info', 'table' or 'exit'. Defaults to 'info'.
+        completions (tuple, optional): The completion kind of every argument. Defaults to no completion.
+        """
+        if output not in self.OUTPUT_KINDS:
+            raise ValueError(f"Unknown command output kind: {output}")
+        for kind in completions:
+            if kind is not None and kind not in self.COMPLETION_KINDS:
+                raise ValueError(f"Unknown command completion kind: {kind}")
+        self.name = name
+        self.handler = handler
+        self.arguments = arguments
+        self.description = description
+        self.min_args, self.max_args = arity
+        self.output = output
+        self.completions = completions
+
+    def accepts(self, count: int):
+        """
+        Checks whether the command accepts the given number of arguments.
+
+        Parameters:
+        count (int): The number of arguments.
+
+        Returns:
+        bool: True if the number of arguments is valid, False otherwise.
+        """
+        return self.min_args <= count and (self.max_args is None or count <= self.max_args)
+
+
+COMMANDS = {
+    command.name: command
+    for command in (
+        Command(
+            "add-contact",
+            "add_contact",
+            "[<name> <phone> [<email> [<birthday> [<address>]]]]",
+            "Runs user dialog in order to add a new contact.\nWith arguments the contact is added without the dialog.\nUse quotes for values with spaces.",
+            arity=(0, None),
+            output="info",
+        ),
+        Command(
+            "import-contacts",
+            "import_contacts",
+            "<path>",
+            "Imports contacts from a CSV file with a header, a JSON lines file or a vCard 3.0/4.0 file (.csv, .jsonl, .ndjson, .vcf).\nInvalid and duplicate rows are skipped and reported.",
+            arity=(1, 1),
+            output="info",
+        ),
+        Command(
+            "export-contacts",
+            "export_contacts",
+            "<path> [<criteria> <some-value>] [<vcard-version>]",
+            "Exports the contacts to a CSV, JSON lines or vCard file (.csv, .jsonl, .ndjson, .vcf), or their birthdays as yearly events to an iCalendar file (.ics), gzip-compressed with '.gz' added.\nWith criteria and value only the contacts found like with find-contacts are exported. vCards are written as version 3.0, or 4.0 if given.",
+            arity=(1, 4),
+            output="info",
+            completions=(None, "criteria"),
+        ),
+        Command(
+            "edit-name",
+            "edit_name",
+            "<id> <name>",
+            "Updates the name for the contact with the specified ID.\nName must be different from stored ones.",
+            arity=(2, 2),
+            output="info",
+            completions=("contact",),
+        ),
+        Command(
+            "edit-phone",
+            "edit_phone",
+            "<id> <phone>",
+            "Updates the phone number for the contact with the specified ID.\nPhone must be different from stored ones.",
+            arity=(2, 2),
+            output="info",
+            completions=("contact",),
+        ),
+        Command(
+            "edit-birthday",
+            "edit_birthday",
+            "<id> <birthday>",
+            "Updates the birthday for the contact with the specified ID.\nUse the format DD.MM.YYYY.",
+            arity=(2, 2),
+            output="info",
+            completions=("contact",),
+        ),
+        Command(
+            "edit-email",
+            "edit_email",
+            "<id> <email>",
+            "Updates the email address for the contact with the specified ID.\nEmail must be different from stored ones.",
+            arity=(2, 2),
+            output="info",
+            completions=("contact",),
+        ),
+        Command(
+            "edit-address",
+            "edit_address",
+            "<id> [<address>]",
+            "Runs user dialog to update the physical address for the contact with the specified ID.\nWith the address argument it is updated without the dialog.",
+            arity=(1, None),
+            output="info",
+            completions=("contact",),
+        ),
+        Command(
+            "delete-contact",
+            "delete_contact",
+            "<id>",
+            "Removes the contact with the specified ID from your address book.",
+            arity=(1, 1),
+            output="info",
+            completions=("contact",),
+        ),
+        Command(
+            "find-contacts",
+            "find_contacts",
+            "<criteria> <some-value>",
+            "Finds and retrieves contacts based on the provided criteria and value.\nCriteria acceptable values: 'id', 'name', 'phone', 'email', 'birthday', 'address'.",
+            arity=(2, 2),
+            output="table",
+            completions=("criteria",),
+        ),
+        Command(
+            "fuzzy-find-contacts",
+            "fuzzy_find_contacts",
+            "<name>",
+            "Finds contacts with a name similar to the provided one, the closest first.\nEvery word may have a typo: a wrong, missing, extra or swapped letter.",
+            arity=(1, None),
+            output="table",
+        ),
+        Command(
+            "show-contacts",
+            "show_contacts",
+            "",
+            "Displays all the contacts in your address book.",
+            arity=(0, 0),
+            output="table",
+        ),
+        Command(
+            "show-birthdays",
+            "show_birthdays",
+            "<days-count-from-today>",
+            "Shows the contacts having birthdays within the specified number of days from today inclusive.",
+            arity=(1, 1),
+            output="table",
+        ),
+        Command(
+            "add-note",
+            "add_note",
+            "<note>",
+            "Creates a new note with the provided text content.",
+            arity=(0, None),
+            output="info",
+        ),
+        Command(
+            "edit-note",
+            "edit_note",
+            "<id> <note>",
+            "Edits the note corresponding to the given ID.",
+            arity=(1, None),
+            output="info",
+        ),
+        Command(
+            "find-notes",
+            "find_notes",
+            "<keyword>",
+            "Finds notes containing the specified keyword.",
+            arity=(0, None),
+            output="table",
+        ),
+        Command(
+            "delete-note",
+            "delete_note",
+            "<id>",
+            "Deletes the note with the specified ID.",
+            arity=(1, 1),
+            output="info",
+        ),
+        Command(
+            "show-notes",
+            "show_notes",
+            "",
+            "Displays all the notes in your notebook.",
+            arity=(0, 0),
+            output="table",
+        ),
+        Command(
+            "add-note-tag",
+            "add_note_tag",
+            "<id> <tag>",
+            "Add tag to the note with the specified ID.",
+            arity=(2, 2),
+            output="info",
+            completions=(None, "tag"),
+        ),
+        Command(
+            "delete-note-tag",
+            "delete_note_tag",
+            "<id> <tag>",
+            "Delete tag from the note with the specified ID.",
+            arity=(2, 2),
+            output="info",
+            completions=(None, "note-tag"),
+        ),
+        Command(
+            "edit-note-tag",
+            "edit_note_tag",
+            "<id> <tag> <new-tag>",
+            "Replace tag by new one in the note with the specified ID.",
+            arity=(3, 3),
+            output="info",
+            completions=(None, "note-tag", "tag"),
+        ),
+        Command(
+            "find-notes-by-tag",
+            "find_notes_by_tag",
+            "<tag>",
+            "Find notes by the Tag specified.",
+            arity=(1, 1),
+            output="table",
+            completions=("tag",),
+        ),
+        Command(
+            "export-notes",
+            "export_notes",
+            "<path> [<tag>]",
+            "Exports the notes to a CSV or a JSON lines file (.csv, .jsonl, .ndjson), gzip-compressed with '.gz' added.\nWith a tag only the notes having it are exported.",
+            arity=(1, 2),
+            output="info",
+            completions=(None, "tag"),
+        ),
+        Command(
+            "begin",
+            "begin_transaction",
+            "[contacts|notes]",
+            "Starts a transaction on the contacts (default) or on the notes. Their following changes are saved together by 'commit'.\nChanges of the other storage are saved as usual.",
+            arity=(0, 1),
+            output="info",
+        ),
+        Command(
+            "commit",
+            "commit_transaction",
+            "",
+            "Saves the changes made since 'begin' with a single write.",
+            arity=(0, 0),
+            output="info",
+        ),
+        Command(
+            "rollback",
+            "rollback_transaction",
+            "",
+            "Discards the changes made since 'begin'.\nChanges not committed are also discarded on exit.",
+            arity=(0, 0),
+            output="info",
+        ),
+        Command(
+            "help",
+            "show_help",
+            "",
+            "Displays this list of commands.\nCommands showing a table accept --limit <n>, --offset <n>\nand --format table|tsv|jsonl.",
+            arity=(0, 0),
+            output="table",
+        ),
+        Command(
+            "exit",
+            None,
+            "",
+            "Finishes the session.",
+            arity=(0, None),
+            output="exit",
+        ),
+        Command(
+            "close",
+            None,
+            "",
+            "Finishes the session.",
+            arity=(0, None),
+            output="exit",
+        ),
+    )
+}
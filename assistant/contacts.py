@@ -1,8 +1,23 @@
-from collections import UserDict
-from datetime import datetime
+import csv
+import gc
+import json
+import os
+from collections import deque
+from datetime import datetime, timezone
+from itertools import chain, islice
+from pathlib import Path
 
 from assistant.fields import Id, Name, Phone, Email, Birthday, Address
-from assistant.storage import PersistantStorage
+from assistant.indexes import BirthdayIndex, FuzzyIndex, PrefixTrie, TrigramIndex
+from assistant.storage import PersistantStorage, StoredRecord
+from assistant.vformats import (
+    CALENDAR_FOOTER,
+    CALENDAR_HEADER,
+    VCARD_VERSIONS,
+    format_birthday_event,
+    format_vcard,
+    read_vcards,
+)
 from assistant.error_handler import (
     EmptyContactsError,
     InvalidNoteOrContactIDError,
@@ -11,16 +26,21 @@ from assistant.error_handler import (
     EmailIsExistError,
     NoResultsFoundError,
     InvalidBirthdayDaysParameter,
+    InvalidDataFileError,
     FieldValidationError,
 )
 
+IMPORT_CHUNK_SIZE = 5000
+
 
-class Record(UserDict):
+class Record(StoredRecord):
     """
     A class representing a record of an individual, storing personal information.
 
+    Field values are validated by the field classes, but only the resulting values are kept in slots.
+
     Attributes:
-    data (dict): A dictionary to store the individual's information.
+    data (dict): A dictionary view of the individual's information.
     id (int): The unique identifier of the individual.
     name (str): The name of the individual.
     phone (str): The phone number of the individual.
@@ -29,6 +49,9 @@ class Record(UserDict):
     address (str): The home address of the individual.
     """
 
+    __slots__ = ("_id", "_name", "_phone", "_email", "_birthday", "_address")
+    FIELDS = ("id", "name", "phone", "email", "birthday", "address")
+
     def __init__(
         self,
         id: int,
@@ -49,13 +72,6 @@ class Record(UserDict):
         birthday (str, optional): The birthday of the individual. Defaults to an empty string.
         address (str, optional): The address of the individual. Defaults to an empty string.
         """
-        super().__init__()
-        self.data["id"] = None
-        self.data["name"] = ""
-        self.data["phone"] = ""
-        self.data["email"] = ""
-        self.data["birthday"] = ""
-        self.data["address"] = ""
         self.id = id
         self.name = name
         self.phone = phone
@@ -71,7 +87,7 @@ class Record(UserDict):
         Returns:
         int: The unique identifier of the individual.
         """
-        return self.data["id"]
+        return self._id
 
     @id.setter
     def id(self, id: int):
@@ -82,7 +98,7 @@ class Record(UserDict):
         id (int): The unique identifier to be set.
         """
         try:
-            self.data["id"] = Id(id)
+            self._id = Id(id).value
         except FieldValidationError as e:
             raise e
 
@@ -94,7 +110,7 @@ class Record(UserDict):
         Returns:
         str: The name of the individual.
         """
-        return self.data["name"]
+        return self._name
 
     @name.setter
     def name(self, name: str):
@@ -105,7 +121,7 @@ class Record(UserDict):
         name (str): The name to be set.
         """
         try:
-            self.data["name"] = Name(name)
+            self._name = Name(name).value
         except FieldValidationError as e:
             raise e
 
@@ -117,7 +133,7 @@ class Record(UserDict):
         Returns:
         str: The phone number of the individual.
         """
-        return self.data["phone"]
+        return self._phone
 
     @phone.setter
     def phone(self, phone: str):
@@ -128,7 +144,7 @@ class Record(UserDict):
         phone (str): The phone number to be set.
         """
         try:
-            self.data["phone"] = Phone(phone)
+            self._phone = Phone(phone).value
         except FieldValidationError as e:
             raise e
 
@@ -140,7 +156,7 @@ class Record(UserDict):
         Returns:
         str: The email address of the individual.
         """
-        return self.data["email"]
+        return self._email
 
     @email.setter
     def email(self, email: str):
@@ -151,7 +167,7 @@ class Record(UserDict):
         email (str): The email address to be set.
         """
         try:
-            self.data["email"] = Email(email)
+            self._email = Email(email).value
         except FieldValidationError as e:
             raise e
 
@@ -163,7 +179,7 @@ class Record(UserDict):
         Returns:
         str: The birthday of the individual.
         """
-        return self.data["birthday"]
+        return self._birthday
 
     @birthday.setter
     def birthday(self, birthday: str):
@@ -174,7 +190,7 @@ class Record(UserDict):
         birthday (str): The birthday to be set.
         """
         try:
-            self.data["birthday"] = Birthday(birthday)
+            self._birthday = Birthday(birthday).value
         except FieldValidationError as e:
             raise e
 
@@ -186,7 +202,7 @@ class Record(UserDict):
         Returns:
         str: The address of the individual.
         """
-        return self.data["address"]
+        return self._address
 
     @address.setter
     def address(self, address: str):
@@ -197,54 +213,211 @@ class Record(UserDict):
         address (str): The address to be set.
         """
         try:
-            self.data["address"] = Address(address)
+            self._address = Address(address).value
         except FieldValidationError as e:
             raise e
 
 
+def _validate_contact_rows(rows: list):
+    """
+    Validates rows of imported contacts with the field classes. Runs in the worker processes of an import.
+
+    Parameters:
+    rows (list): The rows: lists of the values in the order of ContactsBook.IMPORT_FIELDS, or JSON lines.
+
+    Returns:
+    list: For every row either a tuple of its normalized values or the message of its validation error.
+    """
+    results = []
+    for row in rows:
+        try:
+            if isinstance(row, str):
+                try:
+                    values = json.loads(row)
+                except ValueError:
+                    raise FieldValidationError("The line is not valid JSON.")
+                if not isinstance(values, dict):
+                    raise FieldValidationError("The line is not a JSON object.")
+                row = [values.get(field) for field in ContactsBook.IMPORT_FIELDS]
+            row = ["" if value is None else str(value).strip() for value in row]
+            if not row[0] or not row[1]:
+                raise FieldValidationError("The name and the phone are required.")
+            record = Record(0, *row)
+            results.append(tuple(record.get(field) for field in ContactsBook.IMPORT_FIELDS))
+        except FieldValidationError as e:
+            results.append(str(e))
+    return results
+
+
+def _validate_in_pool(chunks, workers: int):
+    """
+    Validates chunks of imported rows in a pool of worker processes.
+
+    At most two chunks per worker are submitted ahead, so the file is read only as fast as it is validated.
+
+    Parameters:
+    chunks (Iterator[list]): The chunks of rows.
+    workers (int): The number of worker processes.
+
+    Yields:
+    list: The validation results of every chunk, in the order of the chunks.
+    """
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+
+    # The storage may run a background writer thread, and forking a process with threads is not safe
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(workers, mp_context=context) as executor:
+        pending = deque()
+        for chunk in chunks:
+            pending.append(executor.submit(_validate_contact_rows, chunk))
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
 class ContactsBook(PersistantStorage):
     """
     A class representing a contacts book, storing and managing a collection of contacts.
 
     Inherits from PersistentStorage for CSV file operations.
 
+    Records are additionally indexed by name, phone and email, so uniqueness checks and
+    name lookups do not scan the whole book, and all the searchable fields have trigram indexes
+    for substring search. Birthdays are indexed by the day of the year for upcoming birthday
+    queries. Every mutating method keeps the indexes up to date.
+
+    The trigram indexes cost more than the loading of the records itself, so they are built by
+    the first substring search rather than when the book is opened. The phones and the DD.MM.YYYY
+    birthdays are indexed too, so only queries shorter than a trigram scan the book.
+
     Attributes:
         data (list): A list to store the contact records.
+        _names (dict): Index from the lowercased contact name to the record.
+        _phones (dict): Index from the phone number to the record.
+        _emails (dict): Index from the email address to the record.
+        _search (dict[str, TrigramIndex]): Substring search indexes of the TRIGRAM_FIELDS, or None until the
+            next search.
+        _birthdays (BirthdayIndex): Index of the records by the day of the year of their birthday.
+        _name_prefixes (PrefixTrie): Prefix index from the lowercased contact name to the record, for completion.
+        _fuzzy_names (FuzzyIndex): Typo-tolerant index of the records by the terms of their lowercased names,
+            or None until the first fuzzy search.
     """
 
-    def __init__(self):
+    UNIQUE_FIELDS = ("name", "phone", "email")
+    SEARCH_FIELDS = ("name", "phone", "email", "birthday", "address")
+    TRIGRAM_FIELDS = ("name", "phone", "email", "birthday", "address")
+    CRITERIA = ("id",) + SEARCH_FIELDS
+    IMPORT_FIELDS = ("name", "phone", "email", "birthday", "address")
+    FILE_FORMATS = {**PersistantStorage.FILE_FORMATS, ".vcf": "vcard", ".vcard": "vcard", ".ics": "ical"}
+    IMPORT_FORMATS = {**PersistantStorage.FILE_FORMATS, ".vcf": "vcard", ".vcard": "vcard"}
+
+    def __init__(self, **storage_options):
         """
         Initializes a new ContactsBook instance with specified column headers and record type.
+
+        Parameters:
+        **storage_options: Keyword arguments passed to PersistantStorage (e.g. journaled=True).
         """
         super().__init__(
             "contacts.csv",
             ["id", "name", "phone", "email", "birthday", "address"],
             Record,
+            **storage_options,
         )
+        self._names = {}
+        self._phones = {}
+        self._emails = {}
+        self._unique = {"name": self._names, "phone": self._phones, "email": self._emails}
+        self._search = None
+        self._birthdays = BirthdayIndex()
+        self._name_prefixes = PrefixTrie()
+        self._fuzzy_names = None
 
-    def _get_available_ids(self):
+    def _index(self, record: Record, fields: tuple = SEARCH_FIELDS):
         """
-        Get the available contact IDs.
+        Adds a record to the indexes of the specified fields.
+
+        Parameters:
+        - record (Record): The record to be indexed.
+        - fields (tuple, optional): The fields to be indexed. Defaults to all searchable fields.
+        """
+        for field in fields:
+            value = str(getattr(record, field)).lower()
+            if field in self._unique and value:
+                self._unique[field][value] = record
+            if field == "name":
+                self._name_prefixes.add(value, record)
+                if self._fuzzy_names is not None:
+                    self._fuzzy_names.add(record, value)
+            if field == "birthday":
+                self._birthdays.add(record, value)
+            if self._search is not None and field in self._search:
+                self._search[field].add(record, value)
+
+    def _unindex(self, record: Record, fields: tuple = SEARCH_FIELDS):
+        """
+        Removes a record from the indexes of the specified fields.
+
+        Parameters:
+        - record (Record): The record to be removed from the indexes.
+        - fields (tuple, optional): The fields to be removed. Defaults to all searchable fields.
+        """
+        for field in fields:
+            value = str(getattr(record, field)).lower()
+            if field in self._unique:
+                self._unique[field].pop(value, None)
+            if field == "name":
+                self._name_prefixes.remove(value)
+                if self._fuzzy_names is not None:
+                    self._fuzzy_names.remove(record, value)
+            if field == "birthday":
+                self._birthdays.remove(record, value)
+            if self._search is not None and field in self._search:
+                self._search[field].remove(record, value)
+
+    def _build_indexes(self):
+        """
+        Builds the indexes for all the loaded records.
+        """
+        for index in self._unique.values():
+            index.clear()
+        self._search = None
+        self._birthdays = BirthdayIndex()
+        self._name_prefixes = PrefixTrie()
+        self._fuzzy_names = None
+        for record in self._elements():
+            self._index(record)
+
+    def _search_indexes(self):
+        """
+        Gets the substring search indexes, building them on the first search after the book was opened or
+        a large import dropped them.
 
         Returns:
-        tuple: A tuple containing the available contact IDs.
+        dict[str, TrigramIndex]: The substring search indexes of the TRIGRAM_FIELDS.
         """
-        if not self.data:
-            return ()
-        return tuple(range(0, len(self.data)))
+        if self._search is None:
+            search = {field: TrigramIndex() for field in self.TRIGRAM_FIELDS}
+            for record in self._elements():
+                for field in self.TRIGRAM_FIELDS:
+                    search[field].add(record, str(getattr(record, field)).lower())
+            self._search = search
+        return self._search
 
-    def _update_ids(self):
+    def complete_names(self, prefix: str, limit: int):
         """
-        Update the IDs of all contacts in the storage to match their current positions.
+        Finds the contacts whose names start with the given prefix, for the completion of contact arguments.
 
-        This function is typically called after contacts have been added or deleted, ensuring
-        that the IDs of the remaining contacts reflect their sequential order in the storage.
+        Parameters:
+        - prefix (str): The typed beginning of the name, in any case.
+        - limit (int): The maximal number of results.
 
         Returns:
-        None
+        list: The matching contacts, ordered by their lowercased names.
         """
-        for id in range(len(self.data)):
-            self.data[id].id = id
+        return self._name_prefixes.complete(prefix.lower(), limit)
 
     def check_phone_uniqueness(self, phone: str):
         """
@@ -257,7 +430,7 @@ class ContactsBook(PersistantStorage):
         - PhoneIsExistError: If a contact with the specified phone number already exists.
         """
         phone = Phone(phone)
-        if any(str(record.phone) == str(phone.value) for record in self.data):
+        if str(phone.value).lower() in self._phones:
             raise PhoneIsExistError(
                 f"Contact with the phone: {phone} already exists.")
 
@@ -272,7 +445,7 @@ class ContactsBook(PersistantStorage):
         - NameIsExistError: If a contact with the specified name already exists.
         """
         name = Name(name)
-        if any(str(record.name) == str(name.value) for record in self.data):
+        if str(name.value).lower() in self._names:
             raise NameIsExistError(
                 f"Contact with the name: {name} already exists.")
 
@@ -289,10 +462,37 @@ class ContactsBook(PersistantStorage):
         email = Email(email)
         if email == "":
             return
-        if any(str(record.email) == str(email.value) for record in self.data):
+        if str(email.value).lower() in self._emails:
             raise EmailIsExistError(
                 f"Contact with the email: {email} already exists.")
 
+    def check_edits(self, id: str, edits: dict):
+        """
+        Check edits of a contact without applying them, raising the errors the edit_* methods would raise.
+
+        Several fields can then be edited one after another without leaving the contact half-edited when one
+        of the edits is invalid.
+
+        Parameters:
+        - id (str): The ID of the contact to be edited.
+        - edits (dict): The new values by the field names: 'name', 'phone', 'email', 'birthday' or 'address'.
+
+        Raises:
+        - InvalidNoteOrContactIDError: If the provided contact ID is invalid.
+        - NameIsExistError, PhoneIsExistError, EmailIsExistError: If another contact has the new value.
+        - FieldValidationError: If a value is invalid.
+        """
+        self.check_contacts_ids_for(id)
+        checks = {
+            "name": self.check_name_uniqueness,
+            "phone": self.check_phone_uniqueness,
+            "email": self._check_email_uniqueness,
+            "birthday": Birthday,
+            "address": Address,
+        }
+        for field, value in edits.items():
+            checks[field](value)
+
     def _check_empty_result(self, content: list):
         """
         Check if the search result is empty.
@@ -337,13 +537,16 @@ class ContactsBook(PersistantStorage):
         """
         if id:
             id = Id(id).value
-        ids = self._get_available_ids()
-        if not ids:
+        count = self._count()
+        if not count:
             raise EmptyContactsError("Error: Contacts list is empty.")
-        if id and id not in ids:
-            error_msg = f"Error: Invalid contact Id. Possible Id: 0."
-            if len(ids) > 1:
-                error_msg = error_msg[:-1] + f"-{len(ids)-1}"
+        if id is not None and not self._has_id(id):
+            if self.stable_ids:
+                error_msg = f"Error: Invalid contact Id: {id}."
+            else:
+                error_msg = f"Error: Invalid contact Id. Possible Id: 0."
+                if count > 1:
+                    error_msg = error_msg[:-1] + f"-{count-1}"
             raise InvalidNoteOrContactIDError(error_msg)
         return id
 
@@ -372,19 +575,19 @@ class ContactsBook(PersistantStorage):
         Returns:
         int: The ID associated with the contact's name.
         """
-        result = list(
-            filter(lambda contact: str(contact.name).lower() == name.lower(), self.data)
-        )
-        if not result:
+        record = self._names.get(name.lower())
+        if record is None:
             raise NoResultsFoundError(f"Error: Id not found for name: {name}")
-        assert len(result) == 1
-        return result[0].id.value
+        return record.id
 
     @PersistantStorage.update
     def add_contact(
         self,
         name: str,
         phone: str,
+        email: str = "",
+        birthday: str = "",
+        address: str = "",
     ):
         """
         Add a new contact with the specified details.
@@ -392,17 +595,206 @@ class ContactsBook(PersistantStorage):
         Parameters:
         - name (str): The name of the contact.
         - phone (str): The phone number of the contact.
+        - email (str, optional): The email of the contact. Defaults to an empty string.
+        - birthday (str, optional): The birthday of the contact. Defaults to an empty string.
+        - address (str, optional): The address of the contact. Defaults to an empty string.
 
         Returns:
         str: A message indicating the success of adding the contact.
         """
         self.check_name_uniqueness(name)
         self.check_phone_uniqueness(phone)
-        id = len(self.data)
-        record = Record(id, name, phone)
-        self.data.append(record)
+        self._check_email_uniqueness(email)
+        record = Record(0, name, phone, email, birthday, address)
+        id = self._allocate_id()
+        record.id = id
+        self._append_element(record)
+        self._index(record)
+        self._stage_put(record)
         return f"Contact added successfully with Id: {id}."
 
+    @staticmethod
+    def _read_import_rows(file, import_format: str):
+        """
+        Reads the rows of a file to import contacts from.
+
+        Parameters:
+        - file: The opened file.
+        - import_format (str): One of the values of IMPORT_FORMATS: 'csv', 'jsonl' or 'vcard'.
+
+        Raises:
+        - InvalidDataFileError: If a CSV file has no header with the name and phone columns.
+
+        Returns:
+        Iterator: The rows: lists of the values in the order of IMPORT_FIELDS for CSV and vCard, the lines for
+            JSON lines. Blank lines are skipped, and every vCard is a row.
+        """
+        if import_format == "jsonl":
+            return (line for line in file if line.strip())
+        if import_format == "vcard":
+            return ([card[field] for field in ContactsBook.IMPORT_FIELDS] for card in read_vcards(file))
+        reader = csv.reader(file)
+        header = [column.strip().lower() for column in next(reader, [])]
+        if "name" not in header or "phone" not in header:
+            raise InvalidDataFileError("Error: The CSV file needs a header with the 'name' and 'phone' columns.")
+        positions = [header.index(field) if field in header else None for field in ContactsBook.IMPORT_FIELDS]
+        return (
+            [row[position] if position is not None and position < len(row) else "" for position in positions]
+            for row in reader
+            if row
+        )
+
+    def import_contacts(self, path: str, workers: int = None):
+        """
+        Import contacts from a CSV file with a header, a JSON lines file or a vCard file, by the file extension.
+
+        The file is read in chunks of IMPORT_CHUNK_SIZE rows, which are validated with the field classes in a
+        pool of worker processes, and the valid contacts are added as the chunks come back, in the order of the
+        file. Rows which are invalid or whose name, phone or email is already stored (or came earlier in the
+        file) are skipped and reported. All the added contacts are persisted once, at the end.
+
+        Parameters:
+        - path (str): The path of the file (.csv, .jsonl, .ndjson, .vcf or .vcard). A leading ~ is expanded.
+            vCards 3.0 and 4.0 are read card by card and mapped to the contact fields (see read_vcards).
+        - workers (int, optional): The number of worker processes. Defaults to the number of CPUs. A single
+            worker, or a file of a single chunk, is validated in this process.
+
+        Raises:
+        - InvalidDataFileError: If the file can not be read, its format is unknown or a CSV file lacks the
+            required columns.
+
+        Returns:
+        tuple: The number of added contacts and the skipped rows as (row number, error message) tuples.
+            The rows are numbered from 1, without the CSV header and the blank lines; the cards of a vCard file
+            are numbered as rows.
+        """
+        path = Path(path).expanduser()
+        import_format = self.IMPORT_FORMATS.get(path.suffix.lower())
+        if import_format is None:
+            raise InvalidDataFileError(
+                f"Error: Contacts can be imported from {', '.join(self.IMPORT_FORMATS)} files only."
+            )
+        workers = workers or os.cpu_count() or 1
+        try:
+            # Files saved by some phones and spreadsheets start with a byte order mark
+            file = open(path, newline="", encoding="utf-8-sig")
+        except OSError as e:
+            raise InvalidDataFileError(f"Error: The file {path} can not be read: {e.strerror}.")
+        # The cyclic garbage collector would scan all the stored contacts again and again while millions of
+        # new objects are created, although contacts have no reference cycles
+        collecting = gc.isenabled()
+        gc.disable()
+        try:
+            with file:
+                rows = self._read_import_rows(file, import_format)
+                chunks = iter(lambda: list(islice(rows, IMPORT_CHUNK_SIZE)), [])
+                first = next(chunks, [])
+                second = next(chunks, None)
+                if second is None or workers == 1:
+                    validated = map(_validate_contact_rows, chain([first], [second] if second else [], chunks))
+                else:
+                    validated = _validate_in_pool(chain([first, second], chunks), workers)
+                return self._add_validated(validated)
+        finally:
+            if collecting:
+                gc.enable()
+
+    @PersistantStorage.update
+    def _add_validated(self, validated):
+        """
+        Add the validated contacts of an import, skipping the invalid and the duplicate ones.
+
+        Parameters:
+        - validated (Iterable[list]): The validation results of the chunks of rows.
+
+        Returns:
+        tuple: The number of added contacts and the skipped rows as (row number, error message) tuples.
+        """
+        added, skipped, number = 0, [], 0
+        # The search indexes, if a search has built them, cost the most per contact. Once the import has added as many contacts as were
+        # stored, they are dropped: the next search rebuilds them at most at twice the cost of indexing the
+        # import, and a session without searches does not pay for them at all.
+        deferred_after = max(IMPORT_CHUNK_SIZE, self._count())
+        for results in validated:
+            if added >= deferred_after:
+                self._search = None
+                self._fuzzy_names = None
+            for values in results:
+                number += 1
+                if isinstance(values, str):
+                    skipped.append((number, values))
+                    continue
+                name, phone, email = values[:3]
+                if name.lower() in self._names:
+                    skipped.append((number, f"Contact with the name: {name} already exists."))
+                elif phone in self._phones:
+                    skipped.append((number, f"Contact with the phone: {phone} already exists."))
+                elif email and email.lower() in self._emails:
+                    skipped.append((number, f"Contact with the email: {email} already exists."))
+                else:
+                    record = Record.from_trusted(self._allocate_id(), *values)
+                    self._append_element(record)
+                    self._index(record)
+                    self._stage_put(record)
+                    added += 1
+        return added, skipped
+
+    def _export_frame(self, export_format: str, **options):
+        """
+        Gets the text written before and after the contacts of an export: the calendar of an iCalendar file.
+        """
+        if export_format == "ical":
+            return CALENDAR_HEADER, CALENDAR_FOOTER
+        return super()._export_frame(export_format, **options)
+
+    def _export_lines(self, export_format: str, elements: list, vcard_version: str = VCARD_VERSIONS[0], **options):
+        """
+        Formats a page of exported contacts as vCards, as iCalendar birthday events or as the stored values.
+        """
+        if export_format == "vcard":
+            return "".join(
+                format_vcard(record.name, record.phone, record.email, record.birthday, record.address, vcard_version)
+                for record in elements
+            )
+        if export_format == "ical":
+            stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+            return "".join(
+                format_birthday_event(
+                    f"contact-{record.id}-birthday@personal-assistant", record.name, record.birthday, stamp
+                )
+                for record in elements
+            )
+        return super()._export_lines(export_format, elements, **options)
+
+    def export_contacts(self, path: str, criteria: str = None, value: str = None, vcard_version: str = "3.0"):
+        """
+        Export the contacts to a CSV, JSON lines or vCard file, or their birthdays to an iCalendar file, by the
+        extension of the path. Every format may be gzip-compressed.
+
+        An iCalendar file holds an event recurring every year on the birthday of every contact with a birthday.
+
+        Parameters:
+        - path (str): The path of the file, e.g. 'contacts.csv', 'contacts.jsonl.gz', 'contacts.vcf' or
+            'birthdays.ics'.
+        - criteria (str, optional): The criteria to export only the contacts found by find_contacts.
+        - value (str, optional): The value to search for with the criteria.
+        - vcard_version (str, optional): The version of the vCards, '3.0' or '4.0'. Defaults to '3.0'.
+
+        Raises:
+        - InvalidDataFileError: If the format of the file or the vCard version is unknown, or the file can not
+            be written.
+        - NoResultsFoundError: If no contacts are found with the criteria and value.
+
+        Returns:
+        int: The number of exported contacts.
+        """
+        if vcard_version not in VCARD_VERSIONS:
+            raise InvalidDataFileError(f"Error: vCards can be exported as version {' or '.join(VCARD_VERSIONS)} only.")
+        contacts = None if criteria is None else self.find_contacts(criteria, value)
+        if self.file_format(path) == "ical":
+            contacts = (record for record in (self._elements() if contacts is None else contacts) if record.birthday)
+        return self.export(path, contacts, vcard_version=vcard_version)
+
     @PersistantStorage.update
     def delete_contact(self, id: str):
         """
@@ -418,8 +810,8 @@ class ContactsBook(PersistantStorage):
         str: A message indicating the success of deleting the contact.
         """
         id = self.check_contacts_ids_for(id)
-        self.data.pop(id)
-        self._update_ids()
+        self._unindex(self._remove_element(id))
+        self._stage_delete(id)
         return f"Contact with Id: {id} successfully deleted."
 
     def show_contacts(self):
@@ -430,10 +822,10 @@ class ContactsBook(PersistantStorage):
         - EmptyContactsError: If the contacts list is empty.
 
         Returns:
-        list: A list containing all contacts.
+        Iterator: The contacts in the order of their IDs. They are produced while being consumed.
         """
         self.check_contacts_ids()
-        return self.data
+        return self._elements()
 
     def find_contacts(self, criteria, value):
         """
@@ -454,14 +846,52 @@ class ContactsBook(PersistantStorage):
         result = []
         criteria = criteria.lower()
         value = value.lower()
-        if criteria in ("id", "name", "phone", "email", "birthday", "address"):
-            for record in self.data:
+        if criteria in self.CRITERIA:
+            candidates = None
+            if criteria in self.TRIGRAM_FIELDS:
+                candidates = self._search_indexes()[criteria].search(value)
+            if candidates is None:
+                candidates = self._elements()
+            else:
+                candidates = sorted(candidates, key=lambda record: record.id)
+            for record in candidates:
                 prop = getattr(record, criteria)
-                if value in str(prop.value).lower():
+                if value in str(prop).lower():
                     result.append(record)
         self._check_empty_result(result)
         return result
 
+    def fuzzy_find_contacts(self, name: str):
+        """
+        Find contacts by name, tolerating a typo in every word of the name.
+
+        A contact matches if every word of the searched name is at most one edit (an inserted, deleted or
+        substituted letter, or two swapped adjacent letters) away from a word of its name, e.g. 'jhon' finds
+        'John Smith'. The contacts are ranked by the total number of edits, then by their IDs.
+
+        The fuzzy index costs about as much as the other indexes together, so it is built by the first search
+        only and kept up to date afterwards.
+
+        Parameters:
+        - name (str): The name, or a part of it, with possible typos.
+
+        Raises:
+        - EmptyContactsError: If the contacts list is empty.
+        - NoResultsFoundError: If no contacts have a similar name.
+
+        Returns:
+        list: A list of contacts with a similar name, the closest first.
+        """
+        self.check_contacts_ids()
+        if self._fuzzy_names is None:
+            self._fuzzy_names = FuzzyIndex()
+            for record in self._elements():
+                self._fuzzy_names.add(record, str(record.name).lower())
+        matches = self._fuzzy_names.search(name.lower()) or {}
+        result = sorted(matches, key=lambda record: (matches[record], record.id))
+        self._check_empty_result(result)
+        return result
+
     @PersistantStorage.update
     def edit_name(self, id: str, name: str):
         """
@@ -480,7 +910,12 @@ class ContactsBook(PersistantStorage):
         """
         id = self.check_contacts_ids_for(id)
         self.check_name_uniqueness(name)
-        self.data[id].name = name
+        record = self._get_element(id)
+        name = Name(name).value
+        self._unindex(record, ("name",))
+        record.name = name
+        self._index(record, ("name",))
+        self._stage_put(record)
         return f"Name successfully updated for contact with Id: {id}"
 
     @PersistantStorage.update
@@ -501,7 +936,12 @@ class ContactsBook(PersistantStorage):
         """
         id = self.check_contacts_ids_for(id)
         self.check_phone_uniqueness(phone)
-        self.data[id].phone = phone
+        record = self._get_element(id)
+        phone = Phone(phone).value
+        self._unindex(record, ("phone",))
+        record.phone = phone
+        self._index(record, ("phone",))
+        self._stage_put(record)
         return f"Phone successfully updated for contact with Id: {id}"
 
     @PersistantStorage.update
@@ -522,7 +962,12 @@ class ContactsBook(PersistantStorage):
         """
         id = self.check_contacts_ids_for(id)
         self._check_email_uniqueness(email)
-        self.data[id].email = email
+        record = self._get_element(id)
+        email = Email(email).value
+        self._unindex(record, ("email",))
+        record.email = email
+        self._index(record, ("email",))
+        self._stage_put(record)
         return f"Email successfully updated for contact with Id: {id}"
 
     @PersistantStorage.update
@@ -541,7 +986,12 @@ class ContactsBook(PersistantStorage):
         str: A message indicating the success of editing the address.
         """
         id = self.check_contacts_ids_for(id)
-        self.data[id].address = address
+        record = self._get_element(id)
+        address = Address(address).value
+        self._unindex(record, ("address",))
+        record.address = address
+        self._index(record, ("address",))
+        self._stage_put(record)
         return f"Address successfully updated for contact with Id: {id}"
 
     @PersistantStorage.update
@@ -560,7 +1010,12 @@ class ContactsBook(PersistantStorage):
         str: A message indicating the success of editing the birthday.
         """
         id = self.check_contacts_ids_for(id)
-        self.data[id].birthday = birthday
+        record = self._get_element(id)
+        birthday = Birthday(birthday).value
+        self._unindex(record, ("birthday",))
+        record.birthday = birthday
+        self._index(record, ("birthday",))
+        self._stage_put(record)
         return f"Birthday successfully updated for contact with Id: {id}"
 
     def show_birthdays(self, number_of_days: str):
@@ -584,29 +1039,13 @@ class ContactsBook(PersistantStorage):
         birthdays_dict = {}
         number_of_days = int(number_of_days)
 
-        for record in self.data:
-            if str(record.birthday):
-                birth_date = datetime.strptime(
-                    str(record.birthday), "%d.%m.%Y"
-                ).replace(year=today.year).date()
-                if birth_date < today:
-                    birth_date = birth_date.replace(year=today.year + 1)
-
-                if birth_date.month == 2 and birth_date.day == 29:
-                    if not (
-                        today.year % 4 == 0
-                        and (today.year % 100 != 0 or today.year % 400 == 0)
-                    ):
-                        birth_date = datetime(today.year, 3, 1)
-
-                delta = (birth_date - today).days
-
-                if 0 <= delta < number_of_days:
-                    formatted_birthday = birth_date.strftime("%d.%m.%Y")
-                    if formatted_birthday in birthdays_dict:
-                        birthdays_dict[formatted_birthday].append(str(record.name))
-                    else:
-                        birthdays_dict[formatted_birthday] = [str(record.name)]
+        for birth_date, records in self._birthdays.upcoming(today, number_of_days):
+            formatted_birthday = birth_date.strftime("%d.%m.%Y")
+            names = [str(record.name) for record in sorted(records, key=lambda record: record.id)]
+            if formatted_birthday in birthdays_dict:
+                birthdays_dict[formatted_birthday].extend(names)
+            else:
+                birthdays_dict[formatted_birthday] = names
 
         formatted_birthdays = [
             {"date": date, "names": ", ".join(names)}
@@ -0,0 +1,200 @@
+import argparse
+import asyncio
+import io
+import json
+import signal
+import socket
+from pathlib import Path
+
+from assistant.client import get_socket_path
+from assistant.contacts import ContactsBook
+from assistant.main import Assistant, get_storage_options
+from assistant.notes import NotesManager
+from assistant.output_formater import OutputFormatter
+
+REQUEST_LIMIT = 16 * 1024 * 1024
+
+
+class AssistantDaemon:
+    """
+    A long-running server keeping the contacts and the notes loaded and executing commands sent over a Unix
+    domain socket.
+
+    Every request and every response is a single line of JSON. A request holds the command with its arguments
+    ({"args": [...]}) or asks the daemon to stop ({"shutdown": true}). A response holds the plain output of the
+    command ({"stdout": ..., "stderr": ..., "status": 0 or 1}). Commands run one at a time on the event loop,
+    so the storages are never accessed concurrently, and every change is persisted before the response is sent.
+
+    A transaction belongs to the client which opened it: until it is committed or rolled back, the commands of
+    the other clients are refused, so they neither see its changes nor add their own ones to it. The transaction
+    is rolled back if its client disconnects.
+
+    Attributes:
+        contacts (ContactsBook): The opened contacts book.
+        notes (NotesManager): The opened notes manager.
+        socket_path (Path): The path of the socket the daemon listens on.
+        _transaction_client: The client with the open transaction, or None.
+        _stopped (asyncio.Event): Set when the daemon has to stop.
+    """
+
+    def __init__(self, contacts: ContactsBook, notes: NotesManager, socket_path: Path):
+        """
+        Initializes a new AssistantDaemon instance.
+
+        Parameters:
+        contacts (ContactsBook): The opened contacts book.
+        notes (NotesManager): The opened notes manager.
+        socket_path (Path): The path of the socket to listen on.
+        """
+        self.contacts = contacts
+        self.notes = notes
+        self.socket_path = socket_path
+        self._transaction_client = None
+        self._stopped = None
+
+    def _open_transaction(self):
+        """
+        Gets the storage with the open transaction, or None if no transaction is open.
+        """
+        return next((storage for storage in (self.contacts, self.notes) if storage.in_transaction), None)
+
+    def execute(self, args: list, client=None):
+        """
+        Executes a command and captures its output.
+
+        The command is refused if another client has an open transaction.
+
+        Parameters:
+        args (list[str]): The command and its arguments.
+        client (optional): The client sending the command, e.g. its stream writer.
+
+        Returns:
+        dict: The response with the 'stdout', 'stderr' and 'status' keys.
+        """
+        stdout, stderr = io.StringIO(), io.StringIO()
+        formatter = OutputFormatter(plain=True, stdout=stdout, stderr=stderr)
+        if not args:
+            formatter.print_error("No command provided. Please enter a command.")
+        elif self._transaction_client not in (None, client):
+            formatter.print_error("Error: Another client has an open transaction. Try again after its commit.")
+        else:
+            assistant = Assistant(self.contacts, self.notes, formatter, interactive=False)
+            assistant.execute(str(args[0]).lower(), [str(arg) for arg in args[1:]])
+            self._transaction_client = client if self._open_transaction() is not None else None
+        return {
+            "stdout": stdout.getvalue(),
+            "stderr": stderr.getvalue(),
+            "status": 1 if formatter.errors else 0,
+        }
+
+    def handle_request(self, line: bytes, client=None):
+        """
+        Handles a single request line.
+
+        Parameters:
+        line (bytes): The JSON request.
+        client (optional): The client sending the request, e.g. its stream writer.
+
+        Returns:
+        dict: The response.
+        """
+        try:
+            request = json.loads(line)
+        except ValueError:
+            return {"stdout": "", "stderr": "Error: The request is not valid JSON.\n", "status": 1}
+        if not isinstance(request, dict):
+            return {"stdout": "", "stderr": "Error: The request must be a JSON object.\n", "status": 1}
+        if request.get("shutdown"):
+            self._stopped.set()
+            return {"stdout": "", "stderr": "", "status": 0}
+        args = request.get("args")
+        if not isinstance(args, list):
+            return {"stdout": "", "stderr": "Error: The request has no command.\n", "status": 1}
+        return self.execute(args, client)
+
+    async def handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """
+        Serves the requests of a connected client until it disconnects.
+
+        Parameters:
+        reader (asyncio.StreamReader): The stream of the requests.
+        writer (asyncio.StreamWriter): The stream of the responses.
+        """
+        try:
+            while not self._stopped.is_set():
+                line = await reader.readline()
+                if not line:
+                    break
+                response = self.handle_request(line, writer)
+                writer.write(json.dumps(response).encode() + b"\n")
+                await writer.drain()
+        except (ConnectionError, asyncio.LimitOverrunError, ValueError):
+            pass
+        finally:
+            if self._transaction_client is writer:
+                self._transaction_client = None
+                self._open_transaction().rollback()
+            writer.close()
+
+    def _check_socket(self):
+        """
+        Removes the socket file left by a daemon which did not stop properly.
+
+        Raises:
+        RuntimeError: If another daemon is listening on the socket.
+        """
+        if not self.socket_path.exists():
+            return
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(str(self.socket_path))
+        except OSError:
+            self.socket_path.unlink()
+        else:
+            raise RuntimeError(f"Another assistant daemon is listening on {self.socket_path}.")
+        finally:
+            probe.close()
+
+    async def serve(self):
+        """
+        Listens on the socket until a shutdown request or a SIGINT/SIGTERM signal arrives.
+        """
+        self._stopped = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, self._stopped.set)
+        self._check_socket()
+        server = await asyncio.start_unix_server(
+            self.handle_client, path=str(self.socket_path), limit=REQUEST_LIMIT
+        )
+        self.socket_path.chmod(0o600)
+        try:
+            async with server:
+                await self._stopped.wait()
+        finally:
+            self.socket_path.unlink(missing_ok=True)
+
+
+def run_daemon():
+    """
+    Runs the assistant daemon in the foreground.
+
+    The contacts and the notes are loaded once and stay in memory; 'personal-assistant-client' sends the commands.
+    The data is persisted after every change and the storages are closed properly when the daemon stops.
+    """
+    parser = argparse.ArgumentParser(
+        prog="personal-assistant-daemon",
+        description="Keeps the contacts and the notes loaded and serves commands over a Unix domain socket.",
+    )
+    parser.add_argument("--socket", type=Path, help="the path of the socket to listen on")
+    options = parser.parse_args()
+
+    storage_options = get_storage_options()
+    with ContactsBook(**storage_options) as contacts, NotesManager(
+        **storage_options
+    ) as notes:
+        daemon = AssistantDaemon(contacts, notes, options.socket or get_socket_path())
+        try:
+            asyncio.run(daemon.serve())
+        except RuntimeError as e:
+            parser.exit(1, f"Error: {e}\n")
@@ -89,11 +89,25 @@ class TagIsPresentError(_AssistantError):
     pass
 
 
+class TransactionError(_AssistantError):
+    """Raised when a transaction is opened twice or closed without being opened."""
+
+    pass
+
+
+class InvalidDataFileError(_AssistantError):
+    """Raised when a file to import from or export to has an unknown format, can not be opened or lacks the
+    required columns."""
+
+    pass
+
+
 def error_handler(func):
     """
     A decorator function used to handle errors raised by the decorated function.
 
-    It captures specific exceptions raised by the decorated function and formats error messages using an instance of OutputFormatter.
+    It captures specific exceptions raised by the decorated function and formats error messages using the formatter of
+    the object the decorated method belongs to, or an own instance of OutputFormatter if it has none.
 
     Parameters:
     func (function): The function to be decorated.
@@ -101,7 +115,7 @@ def error_handler(func):
     Returns:
     function: The inner function that handles exceptions and returns the result of the decorated function.
     """
-    formatter = OutputFormatter()
+    default_formatter = OutputFormatter()
 
     def inner(*args, **kwargs):
         """
@@ -114,6 +128,7 @@ def error_handler(func):
         Returns:
         Varies: The result of the decorated function or None if an exception is caught.
         """
+        formatter = getattr(args[0], "formatter", default_formatter) if args else default_formatter
         try:
             return func(*args, **kwargs)
         except _AssistantError as e:
@@ -132,7 +147,8 @@ def input_error_handler(func):
     """
     A decorator function used to handle errors raised by the decorated function.
 
-    It captures specific exceptions raised by the decorated function and formats error messages using an instance of OutputFormatter.
+    It captures specific exceptions raised by the decorated function and formats error messages using the formatter of
+    the object the decorated method belongs to, or an own instance of OutputFormatter if it has none.
 
     Parameters:
     func (function): The function to be decorated.
@@ -140,7 +156,7 @@ def input_error_handler(func):
     Returns:
     function: The inner function that handles exceptions and returns the result of the decorated function.
     """
-    formatter = OutputFormatter()
+    default_formatter = OutputFormatter()
 
     def inner(*args, **kwargs):
         """
@@ -153,6 +169,7 @@ def input_error_handler(func):
         Returns:
         Varies: The result of the decorated function or None if an exception is caught.
         """
+        formatter = getattr(args[0], "formatter", default_formatter) if args else default_formatter
         try:
             return func(*args, **kwargs)
         except IndexError:
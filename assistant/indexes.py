@@ -0,0 +1,666 @@
+import re
+from bisect import bisect_left, insort
+from collections import defaultdict
+from datetime import date, timedelta
+from itertools import islice
+
+
+class TrigramIndex:
+    """
+    An in-memory index for substring search over the texts of a collection of items.
+
+    Every text is split into its trigrams (substrings of three characters), and the index keeps a posting set
+    of items for every trigram. A substring query of at least three characters can only match the items present
+    in the postings of all its trigrams, so candidates are found by intersecting these sets, starting from the
+    smallest one. Candidates still have to be verified by the caller.
+
+    Attributes:
+        _postings (defaultdict[str, set]): Index from the trigram to the items containing it.
+    """
+
+    GRAM_SIZE = 3
+
+    def __init__(self):
+        """
+        Initializes a new empty TrigramIndex instance.
+        """
+        self._postings = defaultdict(set)
+
+    def _grams(self, text: str):
+        """
+        Splits the text into its distinct trigrams.
+
+        Parameters:
+        text (str): The text to be split.
+
+        Returns:
+        set[str]: The trigrams of the text.
+        """
+        return {text[i : i + self.GRAM_SIZE] for i in range(len(text) - self.GRAM_SIZE + 1)}
+
+    def add(self, item, text: str):
+        """
+        Adds an item with the given text to the index.
+
+        Parameters:
+        item: The indexed item. It must be hashable.
+        text (str): The text of the item, already normalized (e.g. lowercased).
+        """
+        for gram in self._grams(text):
+            self._postings[gram].add(item)
+
+    def remove(self, item, text: str):
+        """
+        Removes an item with the given text from the index.
+
+        Parameters:
+        item: The indexed item.
+        text (str): The text the item was added with.
+        """
+        for gram in self._grams(text):
+            postings = self._postings.get(gram)
+            if postings is None:
+                continue
+            postings.discard(item)
+            if not postings:
+                del self._postings[gram]
+
+    def search(self, query: str):
+        """
+        Finds the items whose text may contain the query.
+
+        Parameters:
+        query (str): The substring to search for, normalized like the indexed texts.
+
+        Returns:
+        set | None: The candidate items, or None if the query is too short to use the index.
+        """
+        if len(query) < self.GRAM_SIZE:
+            return None
+        postings = []
+        for gram in self._grams(query):
+            items = self._postings.get(gram)
+            if not items:
+                return set()
+            postings.append(items)
+        postings.sort(key=len)
+        result = set(postings[0])
+        for items in postings[1:]:
+            result.intersection_update(items)
+            if not result:
+                break
+        return result
+
+
+class BirthdayIndex:
+    """
+    An in-memory index of items by the day of the year of their birthday.
+
+    The distinct (month, day) keys are kept in a sorted list, so the birthdays of a range of days are found by
+    a binary search followed by a scan over the matching keys only. February 29 is celebrated on March 1 in
+    non-leap years.
+
+    Attributes:
+        _days (list[tuple[int, int]]): The sorted (month, day) keys having at least one item.
+        _items (dict[tuple[int, int], set]): Index from the (month, day) key to the items born on that day.
+    """
+
+    MAX_DAYS = 366
+
+    def __init__(self):
+        """
+        Initializes a new empty BirthdayIndex instance.
+        """
+        self._days = []
+        self._items = {}
+
+    @staticmethod
+    def _key(birthday: str):
+        """
+        Gets the (month, day) key of a birthday.
+
+        Parameters:
+        birthday (str): The birthday in the format DD.MM.YYYY.
+
+        Returns:
+        tuple[int, int]: The month and the day of the birthday.
+        """
+        day, month, _ = birthday.split(".")
+        return int(month), int(day)
+
+    @staticmethod
+    def _date(year: int, key: tuple):
+        """
+        Gets the date a birthday is celebrated on in the given year.
+
+        Parameters:
+        year (int): The year.
+        key (tuple[int, int]): The (month, day) key of the birthday.
+
+        Returns:
+        date: The date of the birthday, March 1 for February 29 in non-leap years.
+        """
+        try:
+            return date(year, *key)
+        except ValueError:
+            return date(year, 3, 1)
+
+    def add(self, item, birthday: str):
+        """
+        Adds an item with the given birthday to the index. Empty birthdays are ignored.
+
+        Parameters:
+        item: The indexed item. It must be hashable.
+        birthday (str): The birthday in the format DD.MM.YYYY.
+        """
+        if not birthday:
+            return
+        key = self._key(birthday)
+        if key not in self._items:
+            insort(self._days, key)
+            self._items[key] = set()
+        self._items[key].add(item)
+
+    def remove(self, item, birthday: str):
+        """
+        Removes an item with the given birthday from the index.
+
+        Parameters:
+        item: The indexed item.
+        birthday (str): The birthday the item was added with.
+        """
+        if not birthday:
+            return
+        key = self._key(birthday)
+        items = self._items.get(key)
+        if items is None:
+            return
+        items.discard(item)
+        if not items:
+            del self._items[key]
+            del self._days[bisect_left(self._days, key)]
+
+    def __range(self, first: tuple, last: tuple):
+        """
+        Iterates over the keys between the first and the last key, both inclusive.
+
+        Parameters:
+        first (tuple[int, int]): The first (month, day) key.
+        last (tuple[int, int]): The last (month, day) key.
+
+        Returns:
+        Iterator[tuple[tuple[int, int], set]]: The keys and their items in ascending order.
+        """
+        i = bisect_left(self._days, first)
+        while i < len(self._days) and self._days[i] <= last:
+            key = self._days[i]
+            yield key, self._items[key]
+            i += 1
+
+    def upcoming(self, start: date, days: int):
+        """
+        Finds the items having a birthday in the given number of days, starting from the given date.
+
+        Every item is reported once, on its nearest birthday.
+
+        Parameters:
+        start (date): The first day of the period.
+        days (int): The length of the period in days.
+
+        Returns:
+        Iterator[tuple[date, set]]: The dates in ascending order with the items celebrating on them.
+        """
+        end = start + timedelta(days=min(days, self.MAX_DAYS))
+        seen = set()
+        for year in range(start.year, end.year + 1):
+            # One day of slack before the period catches February 29 moved to March 1
+            first = max(start - timedelta(days=1), date(year, 1, 1))
+            last = min(end, date(year, 12, 31))
+            for key, items in self.__range((first.month, first.day), (last.month, last.day)):
+                day = self._date(year, key)
+                if not start <= day < end:
+                    continue
+                items = items - seen
+                if items:
+                    seen.update(items)
+                    yield day, items
+
+
+class TextIndex:
+    """
+    An in-memory inverted index for substring search over the texts of a collection of items.
+
+    Every text is split into its terms (runs of word characters), and the index keeps a posting set of items
+    for every term. The vocabulary of terms has its own trigram index. A query matches a text only if its inner
+    terms are terms of the text and its outer terms are parts of terms of the text, so candidates are found by
+    intersecting the postings of the matching terms. Candidates still have to be verified by the caller.
+
+    Attributes:
+        _postings (dict[str, set]): Index from the term to the items containing it.
+        _vocabulary (TrigramIndex): Substring search index of the terms.
+    """
+
+    TERM_PATTERN = re.compile(r"\w+")
+
+    def __init__(self):
+        """
+        Initializes a new empty TextIndex instance.
+        """
+        self._postings = {}
+        self._vocabulary = TrigramIndex()
+
+    def _terms(self, text: str):
+        """
+        Splits the text into its distinct terms.
+
+        Parameters:
+        text (str): The text to be split.
+
+        Returns:
+        set[str]: The terms of the text.
+        """
+        return set(self.TERM_PATTERN.findall(text))
+
+    def add(self, item, text: str):
+        """
+        Adds an item with the given text to the index.
+
+        Parameters:
+        item: The indexed item. It must be hashable.
+        text (str): The text of the item, already normalized (e.g. lowercased).
+        """
+        for term in self._terms(text):
+            postings = self._postings.get(term)
+            if postings is None:
+                postings = self._postings[term] = set()
+                self._vocabulary.add(term, term)
+            postings.add(item)
+
+    def remove(self, item, text: str):
+        """
+        Removes an item with the given text from the index.
+
+        Parameters:
+        item: The indexed item.
+        text (str): The text the item was added with.
+        """
+        for term in self._terms(text):
+            postings = self._postings.get(term)
+            if postings is None:
+                continue
+            postings.discard(item)
+            if not postings:
+                del self._postings[term]
+                self._vocabulary.remove(term, term)
+
+    def __containing(self, part: str):
+        """
+        Finds the terms containing the given part.
+
+        Parameters:
+        part (str): The part of the terms.
+
+        Returns:
+        Iterable[str]: The terms containing the part.
+        """
+        terms = self._vocabulary.search(part)
+        if terms is None:
+            terms = self._postings
+        return [term for term in terms if part in term]
+
+    def search(self, query: str):
+        """
+        Finds the items whose text may contain the query.
+
+        Parameters:
+        query (str): The substring to search for, normalized like the indexed texts.
+
+        Returns:
+        set | None: The candidate items, or None if the query has no terms to use the index with.
+        """
+        terms = self.TERM_PATTERN.findall(query)
+        if not terms:
+            return None
+        inner = set(terms[1:-1])
+        outer = {terms[0], terms[-1]} - inner
+        postings = []
+        for term in inner:
+            items = self._postings.get(term)
+            if not items:
+                return set()
+            postings.append(items)
+        for part in outer:
+            items = set()
+            for term in self.__containing(part):
+                items.update(self._postings[term])
+            if not items:
+                return set()
+            postings.append(items)
+        postings.sort(key=len)
+        result = set(postings[0])
+        for items in postings[1:]:
+            result.intersection_update(items)
+            if not result:
+                break
+        return result
+
+
+class PrefixTrie:
+    """
+    An in-memory prefix index for the completion of keys, e.g. contact names or tags.
+
+    This is a burst trie: a node of the trie is either a leaf holding a sorted bucket of the keys starting with
+    its prefix, or an inner node with a child for every next character. A bucket is split into children once
+    it holds more than BURST_SIZE keys. Unlike a trie with a node per character, this costs a few nodes per
+    thousand keys, and a completion walks down the prefix, bisects one bucket and reads the keys in order, so it
+    does not depend on the number of keys. The keys are expected to be normalized (e.g. lowercased) by the
+    caller and are mapped to a value; a key added several times is kept until it is removed as many times.
+
+    Attributes:
+        _root (_TrieNode): The root node for the empty prefix.
+        _values (dict): Index from the key to a list of its value and the number of times it was added.
+    """
+
+    BURST_SIZE = 256
+
+    class _TrieNode:
+        """
+        A node of the trie: a leaf with the sorted keys of its prefix, or an inner node with children.
+        """
+
+        __slots__ = ("keys", "children", "ends")
+
+        def __init__(self, keys: list = None):
+            self.keys = keys if keys is not None else []
+            self.children = None
+            self.ends = False
+
+    def __init__(self):
+        """
+        Initializes a new empty PrefixTrie instance.
+        """
+        self._root = self._TrieNode()
+        self._values = {}
+
+    def __len__(self):
+        return len(self._values)
+
+    def __burst(self, node: _TrieNode, depth: int):
+        """
+        Splits a leaf into an inner node with a leaf for every next character of its keys.
+
+        Parameters:
+        node (_TrieNode): The leaf, whose keys all have the same first depth characters.
+        depth (int): The length of the prefix of the node.
+        """
+        children = {}
+        for key in node.keys:
+            if len(key) == depth:
+                node.ends = True
+            else:
+                # The keys are sorted, so appending keeps the keys of every child sorted as well
+                children.setdefault(key[depth], self._TrieNode()).keys.append(key)
+        node.keys = None
+        node.children = children
+
+    def add(self, key: str, value=None):
+        """
+        Adds a key to the trie.
+
+        Parameters:
+        key (str): The normalized key.
+        value (optional): The value returned for the key by complete(). Defaults to the key itself.
+        """
+        entry = self._values.get(key)
+        if entry is not None:
+            entry[1] += 1
+            return
+        self._values[key] = [key if value is None else value, 1]
+        node, depth = self._root, 0
+        while node.children is not None:
+            if depth == len(key):
+                node.ends = True
+                return
+            child = node.children.get(key[depth])
+            if child is None:
+                child = node.children[key[depth]] = self._TrieNode()
+            node, depth = child, depth + 1
+        insort(node.keys, key)
+        if len(node.keys) > self.BURST_SIZE:
+            self.__burst(node, depth)
+
+    def remove(self, key: str):
+        """
+        Removes a key from the trie once.
+
+        Parameters:
+        key (str): The normalized key.
+        """
+        entry = self._values.get(key)
+        if entry is None:
+            return
+        entry[1] -= 1
+        if entry[1]:
+            return
+        del self._values[key]
+        node, depth = self._root, 0
+        while node.children is not None:
+            if depth == len(key):
+                node.ends = False
+                return
+            node, depth = node.children[key[depth]], depth + 1
+        position = bisect_left(node.keys, key)
+        del node.keys[position]
+
+    def __walk(self, node: _TrieNode, prefix: str):
+        """
+        Iterates over the keys below a node in their sorted order.
+
+        Parameters:
+        node (_TrieNode): The node whose keys all start with the prefix.
+        prefix (str): The prefix the keys have to start with.
+
+        Yields:
+        str: The keys starting with the prefix.
+        """
+        if node.children is None:
+            for position in range(bisect_left(node.keys, prefix), len(node.keys)):
+                key = node.keys[position]
+                if not key.startswith(prefix):
+                    return
+                yield key
+            return
+        if node.ends:
+            yield prefix
+        for char in sorted(node.children):
+            yield from self.__walk(node.children[char], prefix + char)
+
+    def complete(self, prefix: str, limit: int = None):
+        """
+        Finds the keys starting with the given prefix.
+
+        Parameters:
+        prefix (str): The prefix, normalized like the keys.
+        limit (int, optional): The maximal number of results. Defaults to no limit.
+
+        Returns:
+        list: The values of the matching keys, in the order of the keys.
+        """
+        node, depth = self._root, 0
+        while node.children is not None and depth < len(prefix):
+            node = node.children.get(prefix[depth])
+            if node is None:
+                return []
+            depth += 1
+        return [self._values[key][0] for key in islice(self.__walk(node, prefix), limit)]
+
+
+def edit_distance(first: str, second: str):
+    """
+    Computes the optimal string alignment distance of two strings: the number of inserted, deleted or
+    substituted characters and of transposed adjacent characters needed to turn one string into the other.
+
+    Parameters:
+    first (str): The first string.
+    second (str): The second string.
+
+    Returns:
+    int: The distance.
+    """
+    previous, current = None, list(range(len(second) + 1))
+    for i, char in enumerate(first, 1):
+        before, previous, current = previous, current, [i] + [0] * len(second)
+        for j, other in enumerate(second, 1):
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char != other))
+            if i > 1 and j > 1 and char == second[j - 2] and first[i - 2] == other:
+                current[j] = min(current[j], before[j - 2] + 1)
+    return current[-1]
+
+
+class FuzzyIndex:
+    """
+    An in-memory index for typo-tolerant search over the texts of a collection of items, e.g. contact names.
+
+    Like TextIndex, every text is split into its terms and the index keeps a posting set of items for every
+    term. The vocabulary of terms has a symmetric deletion index (as in SymSpell): every term is stored under
+    each of its variants with one character deleted. A query term and a term one edit apart (an insertion,
+    a deletion, a substitution or a transposition of adjacent characters) always share a variant or one is a
+    variant of the other, so the similar terms are found with a dictionary lookup per variant of the query term
+    instead of computing the distance to every term. The cost depends on the length of the query only.
+
+    Attributes:
+        _postings (dict[str, set]): Index from the term to the items containing it.
+        _variants (dict[str, str | set]): Index from the variant to the term or the set of terms having it.
+    """
+
+    TERM_PATTERN = re.compile(r"\w+")
+
+    def __init__(self):
+        """
+        Initializes a new empty FuzzyIndex instance.
+        """
+        self._postings = {}
+        self._variants = {}
+
+    @staticmethod
+    def _deletions(term: str):
+        """
+        Gets the distinct variants of a term with one character deleted.
+
+        Parameters:
+        term (str): The term.
+
+        Returns:
+        set[str]: The variants of the term.
+        """
+        return {term[:position] + term[position + 1:] for position in range(len(term))}
+
+    def add(self, item, text: str):
+        """
+        Adds an item with the given text to the index.
+
+        Parameters:
+        item: The indexed item. It must be hashable.
+        text (str): The text of the item, already normalized (e.g. lowercased).
+        """
+        for term in set(self.TERM_PATTERN.findall(text)):
+            postings = self._postings.get(term)
+            if postings is None:
+                postings = self._postings[term] = set()
+                for variant in self._deletions(term):
+                    terms = self._variants.get(variant)
+                    if terms is None:
+                        # Most variants belong to a single term, which is stored without a set
+                        self._variants[variant] = term
+                    elif isinstance(terms, str):
+                        self._variants[variant] = {terms, term}
+                    else:
+                        terms.add(term)
+            postings.add(item)
+
+    def remove(self, item, text: str):
+        """
+        Removes an item with the given text from the index.
+
+        Parameters:
+        item: The indexed item.
+        text (str): The text the item was added with.
+        """
+        for term in set(self.TERM_PATTERN.findall(text)):
+            postings = self._postings.get(term)
+            if postings is None:
+                continue
+            postings.discard(item)
+            if postings:
+                continue
+            del self._postings[term]
+            for variant in self._deletions(term):
+                terms = self._variants.get(variant)
+                if terms == term:
+                    del self._variants[variant]
+                elif isinstance(terms, set):
+                    terms.discard(term)
+                    if len(terms) == 1:
+                        self._variants[variant] = terms.pop()
+
+    def __similar(self, query: str):
+        """
+        Finds the terms at most one edit away from a query term.
+
+        Parameters:
+        query (str): The query term.
+
+        Returns:
+        dict[str, int]: The similar terms with their distance to the query term.
+        """
+        candidates = set()
+        for variant in self._deletions(query) | {query}:
+            if variant in self._postings:
+                candidates.add(variant)
+            terms = self._variants.get(variant)
+            if isinstance(terms, str):
+                candidates.add(terms)
+            elif terms:
+                candidates.update(terms)
+        similar = {}
+        for term in candidates:
+            distance = edit_distance(query, term)
+            if distance <= 1:
+                similar[term] = distance
+        return similar
+
+    def search(self, query: str):
+        """
+        Finds the items whose text has a similar term for every term of the query.
+
+        Parameters:
+        query (str): The query, normalized like the indexed texts.
+
+        Returns:
+        dict | None: The matching items with the sum of the distances of the query terms to their closest
+            terms, or None if the query has no terms.
+        """
+        terms = set(self.TERM_PATTERN.findall(query))
+        if not terms:
+            return None
+        matches = [self.__similar(term) for term in terms]
+        # The rarest query term goes first, the items it found are then only checked against the other ones
+        matches.sort(key=lambda similar: sum(len(self._postings[term]) for term in similar))
+        result = None
+        for similar in matches:
+            closest = sorted(similar.items(), key=lambda pair: pair[1])
+            distances = {}
+            if result is None:
+                for term, distance in closest:
+                    for item in self._postings[term]:
+                        distances.setdefault(item, distance)
+            else:
+                for item, total in result.items():
+                    for term, distance in closest:
+                        if item in self._postings[term]:
+                            distances[item] = total + distance
+                            break
+            result = distances
+            if not result:
+                break
+        return result
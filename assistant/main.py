@@ -1,9 +1,18 @@
+import argparse
+import os
+import shlex
+import signal
+import sys
+from contextlib import nullcontext
+from itertools import islice
+
 from assistant.contacts import ContactsBook
 from assistant.notes import NotesManager
+from assistant.commands import COMMANDS
 from assistant.help import assistant_help, get_command_list
-from assistant.error_handler import input_error_handler, error_handler
-from assistant.output_formater import OutputFormatter
-from assistant.autocomplete import AutoCompleter
+from assistant.error_handler import TransactionError, input_error_handler, error_handler
+from assistant.output_formater import TABLE_FORMATS, OutputFormatter
+from assistant.vformats import VCARD_VERSIONS
 
 
 class Assistant:
@@ -13,9 +22,15 @@ class Assistant:
     Attributes:
         WELCOME_MESSAGE (str): A constant string containing the welcome message for the user.
         FAREWELL_MESSAGE (str): A constant string containing the farewell message.
+        ARGUMENTS_ERROR (str): A constant string containing the message for a wrong number of command arguments.
+        IMPORT_ERRORS_SHOWN (int): The maximal number of skipped rows of an import printed with their errors.
+        TRANSACTION_STORAGES (tuple[str]): The storages a transaction can be opened on.
+        TABLE_OPTIONS (tuple[str]): The options of the commands printing tables: the part of the rows printed
+            and the table format.
         contacts (ContactsBook): An instance of ContactsBook for managing contact data.
         notes (NotesManager): An instance of NotesManager for managing note data.
         formatter (OutputFormatter): An instance of OutputFormatter for managing prompts and output messages
+        interactive (bool): Whether missing values may be requested from the user with prompts.
     """
 
     WELCOME_MESSAGE = (
@@ -24,18 +39,31 @@ class Assistant:
         "Type 'help' to see a list of available commands, 'exit' or 'close' to finish the session."
     )
     FAREWELL_MESSAGE = "Goodbye, have a nice day!"
-
-    def __init__(self, contacts: ContactsBook, notes: NotesManager):
+    ARGUMENTS_ERROR = "Error: Insufficient arguments for command provided. Type 'help' to see valid arguments for the command."
+    TABLE_OPTIONS = ("--limit", "--offset", "--format")
+    IMPORT_ERRORS_SHOWN = 100
+    TRANSACTION_STORAGES = ("contacts", "notes")
+
+    def __init__(
+        self,
+        contacts: ContactsBook,
+        notes: NotesManager,
+        formatter: OutputFormatter = None,
+        interactive: bool = True,
+    ):
         """
         Initializes an Assistant instance with contacts and notes management functionality.
 
         Parameters:
         contacts (ContactsBook): An instance of ContactsBook.
         notes (NotesManager): An instance of NotesManager.
+        formatter (OutputFormatter, optional): The formatter for the output. Defaults to a new rich formatter.
+        interactive (bool, optional): Allows requesting missing values with prompts. Defaults to True.
         """
         self.contacts = contacts
         self.notes = notes
-        self.formatter = OutputFormatter()
+        self.formatter = formatter or OutputFormatter()
+        self.interactive = interactive
 
     @error_handler
     def _get_value_request(self, prompt):
@@ -83,24 +111,38 @@ class Assistant:
         """
         Parses the user input into a command and its arguments.
 
+        Values with spaces can be quoted like in a shell, as in batch mode.
+
         Parameters:
         user_input (str): The raw string input from the user.
 
         Returns:
-        tuple: A tuple containing the command and its arguments.
-        """
-        cmd, *args = user_input.split()
+        tuple: A tuple containing the command and its arguments, or None if the quotes are unbalanced.
+        """
+        try:
+            words = user_input.split() if SHELL_QUOTES.isdisjoint(user_input) else shlex.split(user_input)
+        except ValueError as e:
+            self.formatter.print_error(f"Error: The input can not be parsed: {e}.")
+            return None
+        cmd, *args = words
         cmd = cmd.strip().lower()
         return cmd, *args
 
     @error_handler
-    def add_contact(self):
+    def add_contact(self, args=()):
         """
         Adds a new contact to the contacts book.
 
+        Without arguments the contact details are requested from the user in a dialog.
+
+        Parameters:
+        args (list, optional): The name, the phone and optionally the email, the birthday and the address.
+
         Returns:
         str: A message indicating the success or failure of the operation.
         """
+        if args or not self.interactive:
+            return self._add_contact_from(args)
         name = self._get_value_request(
             "name (should contain only letters and spaces)")
         self.contacts.check_name_uniqueness(name)
@@ -132,20 +174,59 @@ class Assistant:
                 self.contacts.edit_address(id, self._get_address_request())
             )
 
+    def _add_contact_from(self, args):
+        """
+        Adds a new contact with the details provided as arguments.
+
+        Parameters:
+        args (list): The name, the phone and optionally the email, the birthday and the address.
+
+        Returns:
+        str: A message indicating the success of the operation.
+        """
+        name, phone, *details = args
+        email, birthday, *address = details + ["", ""][len(details) :]
+        return self.contacts.add_contact(name, phone, email, birthday, " ".join(address))
+
     @error_handler
-    def find_contacts(self, args):
+    def import_contacts(self, args):
         """
-        Finds and retrieves contacts based on the provided criteria and value.
+        Import contacts from a file and print the rows which were skipped.
 
         Parameters:
-        args (list): A list containing the criteria and value to search for.
-                    The first element is the criteria (e.g., "id", "name"), and the second element is the value to search for.
+        - args (tuple): A tuple containing the path of the file.
 
         Returns:
-        list: A list containing the contacts that match the specified criteria and value.
+        str: A message with the number of imported contacts and skipped rows.
         """
-        criteria, value = args
-        return self.contacts.find_contacts(criteria, value)
+        added, skipped = self.contacts.import_contacts(args[0])
+        for number, message in skipped[: self.IMPORT_ERRORS_SHOWN]:
+            self.formatter.print_error(f"Row {number}: {message}")
+        if len(skipped) > self.IMPORT_ERRORS_SHOWN:
+            self.formatter.print_error(f"... and {len(skipped) - self.IMPORT_ERRORS_SHOWN} more skipped rows.")
+        return f"Imported {added} contacts, skipped {len(skipped)} rows."
+
+    @error_handler
+    def export_contacts(self, args):
+        """
+        Export the contacts, or the contacts matching a criteria and value, to a file.
+
+        Parameters:
+        - args (tuple): A tuple containing the path of the file, optionally followed by the criteria and value,
+            and optionally ending with the vCard version.
+
+        Returns:
+        str: A message with the number of exported contacts.
+        """
+        path, *criteria = args
+        vcard_version = "3.0"
+        # The criteria always comes with a value, so an odd argument after them can only be the version
+        if len(criteria) % 2 == 1 and criteria[-1] in VCARD_VERSIONS:
+            vcard_version = criteria.pop()
+        if len(criteria) not in (0, 2):
+            raise ValueError("The criteria requires a value.")
+        count = self.contacts.export_contacts(path, *criteria, vcard_version=vcard_version)
+        return f"Exported {count} contacts to {path}."
 
     @error_handler
     def delete_contact(self, args):
@@ -161,8 +242,77 @@ class Assistant:
         id = args[0]
         return self.contacts.delete_contact(id)
 
+    def _transaction_storage(self):
+        """
+        Gets the storage with the open transaction.
+
+        Returns:
+        PersistantStorage: The contacts or the notes, or None if no transaction is open.
+        """
+        return next((storage for storage in (self.contacts, self.notes) if storage.in_transaction), None)
+
+    @error_handler
+    def begin_transaction(self, args=()):
+        """
+        Opens a transaction on the contacts or on the notes.
+
+        A transaction covers a single storage, because the contacts and the notes are written separately and
+        could not be committed together with a single write. The changes of the other storage are saved as usual.
+
+        Parameters:
+        args (list): Optionally 'contacts' (default) or 'notes'.
+
+        Returns:
+        str: A message indicating the success of the operation.
+        """
+        name = args[0].lower() if args else "contacts"
+        if name not in self.TRANSACTION_STORAGES:
+            raise TransactionError("Error: A transaction is opened on either 'contacts' or 'notes'.")
+        if self._transaction_storage() is not None:
+            raise TransactionError("Error: A transaction is already open.")
+        getattr(self, name).begin()
+        return f"Transaction on the {name} started. Changes are saved by 'commit' and discarded by 'rollback'."
+
+    @error_handler
+    def commit_transaction(self, args=()):
+        """
+        Persists the changes made since the transaction was opened.
+
+        Returns:
+        str: A message indicating the success of the operation.
+        """
+        storage = self._transaction_storage()
+        if storage is None:
+            raise TransactionError("Error: No transaction is open.")
+        storage.commit()
+        return "Transaction committed."
+
+    @error_handler
+    def rollback_transaction(self, args=()):
+        """
+        Discards the changes made since the transaction was opened.
+
+        Returns:
+        str: A message indicating the success of the operation.
+        """
+        storage = self._transaction_storage()
+        if storage is None:
+            raise TransactionError("Error: No transaction is open.")
+        storage.rollback()
+        return "Transaction rolled back."
+
+    @error_handler
+    def show_help(self, args=()):
+        """
+        Retrieves the list of available commands.
+
+        Returns:
+        list: A list of dictionaries describing the commands.
+        """
+        return assistant_help()
+
     @error_handler
-    def show_contacts(self):
+    def show_contacts(self, args=()):
         """
         Retrieves and displays the list of contacts.
 
@@ -172,7 +322,7 @@ class Assistant:
         return self.contacts.show_contacts()
 
     @error_handler
-    def show_notes(self):
+    def show_notes(self, args=()):
         """
         Retrieves and displays the list of notes.
 
@@ -209,6 +359,19 @@ class Assistant:
         criteria, value = args
         return self.contacts.find_contacts(criteria, value)
 
+    @error_handler
+    def fuzzy_find_contacts(self, args):
+        """
+        Find contacts with a name similar to the provided one.
+
+        Parameters:
+        - args (tuple): The words of the name.
+
+        Returns:
+        list: A list of contacts with a similar name, the closest first.
+        """
+        return self.contacts.fuzzy_find_contacts(" ".join(args))
+
     @error_handler
     def edit_name(self, args):
         """
@@ -257,14 +420,20 @@ class Assistant:
         Edit the address of a contact with the specified ID.
 
         Parameters:
-        - args (tuple): A tuple containing the contact ID.
+        - args (tuple): A tuple containing the contact ID and optionally the new address.
+                        Without the address it is requested from the user in a dialog.
 
         Returns:
         str: A message indicating the success of the address edit.
         """
-        id = args[0]
+        id, *address = args
         self.contacts.check_contacts_ids_for(id)
-        address = self._get_address_request()
+        if address:
+            address = " ".join(address)
+        elif self.interactive:
+            address = self._get_address_request()
+        else:
+            raise IndexError("The address is missing.")
         return self.contacts.edit_address(id, address)
 
     @error_handler
@@ -378,6 +547,20 @@ class Assistant:
         id, tag, new_tag = args
         return self.notes.edit_note_tag(id, tag, new_tag)
 
+    @error_handler
+    def export_notes(self, args):
+        """
+        Export the notes, or the notes having a tag, to a file.
+
+        Parameters:
+        - args (tuple): A tuple containing the path of the file, optionally followed by the tag.
+
+        Returns:
+        str: A message with the number of exported notes.
+        """
+        count = self.notes.export_notes(*args)
+        return f"Exported {count} notes to {args[0]}."
+
     @error_handler
     def find_notes_by_tag(self, args):
         """
@@ -391,19 +574,289 @@ class Assistant:
         """
         return self.notes.find_notes_by_tag(args[0])
 
+    def complete_argument(self, command: str, args: list, prefix: str, limit: int):
+        """
+        Finds the completions of an argument of a command from the stored contacts and notes.
+
+        The command registry defines what every argument completes to. A contact argument typed as digits is
+        completed from the contact IDs, otherwise from the contact names, and the completion inserts the ID.
+
+        Parameters:
+        command (str): The command in lower case.
+        args (list): The arguments typed before the completed one.
+        prefix (str): The typed beginning of the completed argument.
+        limit (int): The maximal number of completions.
+
+        Returns:
+        list[tuple]: The completions as (text, display, meta) tuples: the text replacing the prefix, the text
+            shown in the menu and its description or None.
+        """
+        command = COMMANDS.get(command)
+        if command is None or len(args) >= len(command.completions):
+            return []
+        kind = command.completions[len(args)]
+        if kind == "contact":
+            if prefix.isdigit():
+                records = self.contacts.complete_ids(prefix, limit)
+                return [(str(record.id), str(record.id), str(record.name)) for record in records]
+            records = self.contacts.complete_names(prefix, limit)
+            return [(str(record.id), str(record.name), f"ID {record.id}") for record in records]
+        if kind == "criteria":
+            prefix = prefix.lower()
+            return [(criteria, criteria, None) for criteria in ContactsBook.CRITERIA if criteria.startswith(prefix)]
+        if kind in ("tag", "note-tag"):
+            tags = self.notes.complete_tags(prefix, limit, args[0] if kind == "note-tag" else None)
+            return [(tag, tag, None) for tag in tags]
+        return []
+
+    @classmethod
+    def _split_table_options(cls, args: list):
+        """
+        Separates the --limit, --offset and --format options from the arguments of a command printing a table.
+
+        Parameters:
+        args (list): The arguments of the command, e.g. ['name', 'john', '--limit', '10'].
+
+        Returns:
+        tuple: The remaining arguments, the number of skipped rows, the maximal number of rows or None,
+            and the table format or None.
+
+        Raises:
+        ValueError: If an option has no value, or its value is not a non-negative number or a table format.
+        """
+        remaining, options = [], {}
+        args = iter(args)
+        for arg in args:
+            option, separator, value = arg.partition("=")
+            if option not in cls.TABLE_OPTIONS:
+                remaining.append(arg)
+                continue
+            if not separator:
+                value = next(args, "")
+            if option == "--format":
+                if value not in TABLE_FORMATS:
+                    raise ValueError(f"Error: --format requires one of: {', '.join(TABLE_FORMATS)}.")
+                options[option] = value
+            elif not value.isdigit():
+                raise ValueError(f"Error: {option} requires a non-negative number.")
+            else:
+                options[option] = int(value)
+        return remaining, options.get("--offset", 0), options.get("--limit"), options.get("--format")
+
+    def execute(self, command: str, args: list):
+        """
+        Executes a command and prints its result.
+
+        The command is looked up in the command registry, which defines its handler, the number of its
+        arguments and how its result is printed. Commands printing tables accept the --limit and --offset
+        options, which select the printed rows, and the --format option selecting the table format.
+
+        Parameters:
+        command (str): The command in lower case.
+        args (list): The arguments of the command.
+
+        Returns:
+        bool: False if the command ends the session, True otherwise.
+        """
+        command = COMMANDS.get(command)
+        if command is None:
+            self.formatter.print_error("Please, provide a correct command.")
+            return True
+        if command.output == "exit":
+            if self._transaction_storage() is not None:
+                self.formatter.print_info("The changes of the open transaction were discarded.")
+            return False
+        offset, limit, table_format = 0, None, None
+        if command.output == "table":
+            try:
+                args, offset, limit, table_format = self._split_table_options(args)
+            except ValueError as e:
+                self.formatter.print_error(e)
+                return True
+        if not command.accepts(len(args)):
+            self.formatter.print_error(self.ARGUMENTS_ERROR)
+            return True
+        result = getattr(self, command.handler)(args)
+        if command.output == "table":
+            if result is not None and (offset or limit is not None):
+                result = islice(result, offset, None if limit is None else offset + limit)
+            self.formatter.print_table(result, table_format=table_format)
+        else:
+            self.formatter.print_info(result)
+        return True
+
+    def flush(self):
+        """
+        Persists the changes of the contacts and the notes which were not written yet.
+        """
+        self.contacts.flush()
+        self.notes.flush()
+
+
+BATCH_FLUSH_INTERVAL = 1000
+INTERACTIVE_WRITE_POLICY = "interval:200"
+SHELL_QUOTES = frozenset("\"'\\")
+
+
+def get_storage_options():
+    """
+    Gets the storage options for the contacts book and the notes manager.
+
+    The storage backend is selected by the ASSISTANT_STORAGE environment variable ('csv' or 'sqlite'),
+    the fsync policy by the ASSISTANT_FSYNC environment variable ('none', 'data' or 'full').
+
+    Returns:
+    dict: The keyword arguments for ContactsBook and NotesManager.
+    """
+    backend = os.environ.get("ASSISTANT_STORAGE", "csv").lower()
+    fsync_policy = os.environ.get("ASSISTANT_FSYNC", "data").lower()
+    if backend == "sqlite":
+        return {"backend": "sqlite", "stable_ids": True, "fsync_policy": fsync_policy}
+    return {"backend": "csv", "journaled": True, "stable_ids": True, "fsync_policy": fsync_policy}
+
+
+def get_write_policy():
+    """
+    Gets the write policy of the interactive session.
+
+    The policy is set by the ASSISTANT_WRITE_POLICY environment variable, e.g. 'immediate' or 'count:10'
+    (see PersistantStorage). By default the changes are written in the background every 200 milliseconds.
+
+    Returns:
+    str: The write policy for ContactsBook and NotesManager.
+    """
+    return os.environ.get("ASSISTANT_WRITE_POLICY", INTERACTIVE_WRITE_POLICY).lower()
+
+
+def exit_on_termination():
+    """
+    Turns the SIGTERM and SIGHUP signals into SystemExit, so the storages are closed and the changes not
+    written yet are persisted when the terminal is closed or the process is stopped.
+    """
+
+    def terminate(signum, _):
+        raise SystemExit(128 + signum)
+
+    for sig in (signal.SIGTERM, getattr(signal, "SIGHUP", None)):
+        if sig is not None:
+            signal.signal(sig, terminate)
+
+
+def migrate():
+    """
+    Migrates the contacts and notes from the CSV files to the SQLite database.
+
+    The data already stored in the database is replaced. Both storages are opened with stable IDs, as in a
+    session, so the IDs and the next ID to allocate are migrated unchanged.
+    """
+    formatter = OutputFormatter()
+    fsync_policy = get_storage_options()["fsync_policy"]
+    for storage_type in (ContactsBook, NotesManager):
+        with storage_type(
+            backend="csv", journaled=True, stable_ids=True, fsync_policy=fsync_policy
+        ) as source, storage_type(backend="sqlite", stable_ids=True, fsync_policy=fsync_policy) as target:
+            target.data = list(source._elements())
+            target._next_id = source._next_id
+            target.checkpoint()
+            formatter.print_info(
+                f"Migrated {len(target.data)} rows from {source.filename} to the database."
+            )
+
+
+def run_batch(source: str, flush_interval: int = BATCH_FLUSH_INTERVAL, table_format: str = None):
+    """
+    Runs the commands from a file or the standard input without prompts and rich output.
+
+    Every line holds a command with its arguments, split like in a shell, so values with spaces can be quoted.
+    Empty lines and lines starting with '#' are skipped. The changes are written to the storage every
+    flush_interval commands and at the end.
+
+    Parameters:
+    source (str): The path to the file with the commands, or '-' for the standard input.
+    flush_interval (int, optional): The number of commands between the storage writes.
+    table_format (str, optional): The format of the printed tables, 'tsv' or 'jsonl'. Defaults to 'tsv'.
+
+    Returns:
+    int: The exit status: 0 if all the commands succeeded, 1 otherwise.
+    """
+    formatter = OutputFormatter(plain=True, table_format=table_format)
+    storage_options = get_storage_options()
+    exit_on_termination()
+    with ContactsBook(write_policy="exit", **storage_options) as contacts, NotesManager(
+        write_policy="exit", **storage_options
+    ) as notes, (
+        nullcontext(sys.stdin) if source == "-" else open(source, encoding="utf-8")
+    ) as commands:
+        assistant = Assistant(contacts, notes, formatter, interactive=False)
+        executed = 0
+        for number, line in enumerate(commands, 1):
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            try:
+                if SHELL_QUOTES.isdisjoint(line):
+                    command, *args = line.split()
+                else:
+                    command, *args = shlex.split(line)
+            except ValueError as e:
+                formatter.print_error(f"Error: Line {number} can not be parsed: {e}.")
+                continue
+            if not assistant.execute(command.lower(), args):
+                break
+            executed += 1
+            if executed % flush_interval == 0:
+                assistant.flush()
+    return 1 if formatter.errors else 0
+
 
 def run():
     """
     Runs the assistant application, handling user input and responses.
 
     This function initializes the Assistant and handles the main loop for user interaction. It processes user commands and displays responses or errors.
+    With the --batch option the commands are read from a file or the standard input instead (see run_batch).
     """
-    auto_completer = AutoCompleter(get_command_list())
-    formatter = OutputFormatter()
+    parser = argparse.ArgumentParser(
+        prog="personal-assistant",
+        description="Personal assistant for managing contacts and notes.",
+    )
+    parser.add_argument(
+        "--batch",
+        metavar="FILE",
+        help="run the commands from FILE ('-' for the standard input) without prompts and exit",
+    )
+    parser.add_argument(
+        "--flush-every",
+        metavar="N",
+        type=int,
+        default=BATCH_FLUSH_INTERVAL,
+        help=f"write the changes to the storage every N commands in batch mode (default: {BATCH_FLUSH_INTERVAL})",
+    )
+    parser.add_argument(
+        "--format",
+        choices=TABLE_FORMATS,
+        help="print tables laid out, as tab-separated lines or as JSON lines (default: table, tsv in batch mode)",
+    )
+    options = parser.parse_args()
+    if options.flush_every < 1:
+        parser.error("--flush-every must be a positive number")
+    if options.batch is not None:
+        sys.exit(run_batch(options.batch, options.flush_every, options.format))
+
+    # prompt_toolkit is slow to import, so only the interactive session loads it
+    from assistant.autocomplete import AutoCompleter
+
+    formatter = OutputFormatter(table_format=options.format)
     formatter.print_greeting(Assistant.WELCOME_MESSAGE)
 
-    with ContactsBook() as contacts, NotesManager() as notes:
-        assistant = Assistant(contacts, notes)
+    storage_options = get_storage_options()
+    write_policy = get_write_policy()
+    exit_on_termination()
+    with ContactsBook(write_policy=write_policy, **storage_options) as contacts, NotesManager(
+        write_policy=write_policy, **storage_options
+    ) as notes:
+        assistant = Assistant(contacts, notes, formatter)
+        auto_completer = AutoCompleter(get_command_list(), assistant.complete_argument)
 
         while True:
             try:
@@ -420,51 +873,9 @@ def run():
                 # raised only when exception was handled in @input_error_handler
                 continue
 
-            if command in ["exit", "close"]:
+            if not assistant.execute(command, args):
                 formatter.print_greeting(Assistant.FAREWELL_MESSAGE)
                 break
-            elif command == "help":
-                formatter.print_table(assistant_help())
-            elif command == "add-contact":
-                assistant.add_contact()
-            elif command == "delete-contact":
-                formatter.print_info(assistant.delete_contact(args))
-            elif command == "show-contacts":
-                formatter.print_table(assistant.show_contacts())
-            elif command == "find-contacts":
-                formatter.print_table(assistant.find_contacts(args))
-            elif command == "add-note":
-                formatter.print_info(assistant.add_note(args))
-            elif command == "edit-name":
-                formatter.print_info(assistant.edit_name(args))
-            elif command == "edit-phone":
-                formatter.print_info(assistant.edit_phone(args))
-            elif command == "edit-email":
-                formatter.print_info(assistant.edit_email(args))
-            elif command == "edit-address":
-                formatter.print_info(assistant.edit_address(args))
-            elif command == "find-notes":
-                formatter.print_table(assistant.find_notes(args))
-            elif command == "edit-birthday":
-                formatter.print_info(assistant.edit_birthday(args))
-            elif command == "show-birthdays":
-                formatter.print_table(assistant.show_birthdays(args))
-            elif command == "show-notes":
-                formatter.print_table(assistant.show_notes())
-            elif command == "edit-note":
-                formatter.print_info(assistant.edit_note(args))
-            elif command == "delete-note":
-                formatter.print_info(assistant.delete_note(args))
-            elif command == "add-note-tag":
-                formatter.print_info(assistant.add_note_tag(args))
-            elif command == "delete-note-tag":
-                formatter.print_info(assistant.delete_note_tag(args))
-            elif command == "edit-note-tag":
-                formatter.print_info(assistant.edit_note_tag(args))
-            elif command == "find-notes-by-tag":
-                formatter.print_table(assistant.find_notes_by_tag(args))
-            else:
-                formatter.print_error("Please, provide a correct command.")
 
 
 if __name__ == "__main__":
@@ -1,8 +1,9 @@
+import sys
 from datetime import datetime
-from collections import UserDict
 
 from assistant.fields import Id
-from assistant.storage import PersistantStorage
+from assistant.indexes import PrefixTrie, TextIndex
+from assistant.storage import PersistantStorage, StoredRecord
 from assistant.error_handler import (
     InvalidNoteOrContactIDError,
     EmptyNotesError,
@@ -14,16 +15,73 @@ from assistant.error_handler import (
 )
 
 
-class Note(UserDict):
+class NoteTags(dict):
+    """
+    An insertion-ordered set of the tags of a note.
+
+    The tags are the keys of the dictionary, interned so that a tag used by many notes is kept in memory once.
+    The string form is the comma-joined storage format.
+    """
+
+    __slots__ = ()
+
+    def __init__(self, tags=()):
+        """
+        Initializes a new NoteTags instance.
+
+        Parameters:
+        tags (Iterable[str], optional): The initial tags.
+        """
+        super().__init__((sys.intern(tag), None) for tag in tags)
+
+    @classmethod
+    def parse(cls, tags: str):
+        """
+        Creates the tags from their storage format.
+
+        Parameters:
+        tags (str): The comma-joined tags.
+
+        Returns:
+        NoteTags: The parsed tags.
+        """
+        return cls(tags.split(",") if tags else ())
+
+    def add(self, tag: str):
+        """
+        Adds a tag to the end of the tags.
+
+        Parameters:
+        tag (str): The tag to be added.
+        """
+        self[sys.intern(tag)] = None
+
+    def discard(self, tag: str):
+        """
+        Removes a tag if it is present.
+
+        Parameters:
+        tag (str): The tag to be removed.
+        """
+        self.pop(tag, None)
+
+    def __str__(self):
+        return ",".join(self)
+
+
+class Note(StoredRecord):
     """
     A class representing a note, storing its id, timestamp, and content.
 
-    Inherits from UserDict for dictionary-like access to note data.
+    Inherits from StoredRecord for compact storage with dictionary-like access to note data.
 
     Attributes:
-        data (dict): A dictionary to store the note's information.
+        data (dict): A dictionary view of the note's information.
     """
 
+    __slots__ = ("_id", "_timestamp", "_content", "_tags")
+    FIELDS = ("id", "timestamp", "content", "tags")
+
     def __init__(self, id: int, timestamp: str, content: str, tags=""):
         """
         Initializes a new Note instance.
@@ -32,13 +90,8 @@ class Note(UserDict):
         id (int): The unique identifier for the note.
         timestamp (str): The timestamp of when the note was created.
         content (str): The content of the note.
-        tags (str if loaded from storage else list[str]): The content of the note tags.
+        tags (str if loaded from storage else Iterable[str]): The content of the note tags.
         """
-        super().__init__()
-        self.data["id"] = None
-        self.data["timestamp"] = None
-        self.data["content"] = None
-        self.data["tags"] = None
         self.id = id
         self.timestamp = timestamp
         self.content = content
@@ -49,7 +102,7 @@ class Note(UserDict):
         """
         Gets the unique identifier of the note.
         """
-        return self.data["id"]
+        return self._id
 
     @id.setter
     def id(self, id: int):
@@ -60,7 +113,7 @@ class Note(UserDict):
         id (int): The unique identifier to be set.
         """
         try:
-            self.data["id"] = Id(id)
+            self._id = Id(id).value
         except FieldValidationError as e:
             raise e
 
@@ -69,7 +122,7 @@ class Note(UserDict):
         """
         Gets the timestamp of the note.
         """
-        return self.data["timestamp"]
+        return self._timestamp
 
     @timestamp.setter
     def timestamp(self, timestamp: str):
@@ -79,14 +132,14 @@ class Note(UserDict):
         Parameters:
         timestamp (str): The timestamp to be set.
         """
-        self.data["timestamp"] = timestamp
+        self._timestamp = timestamp
 
     @property
     def content(self):
         """
         Gets the content of the note.
         """
-        return self.data["content"]
+        return self._content
 
     @content.setter
     def content(self, content: str):
@@ -96,16 +149,29 @@ class Note(UserDict):
         Parameters:
         content (str): The content to be set.
         """
-        self.data["content"] = content
+        self._content = content
+
+    @classmethod
+    def from_trusted(cls, *values):
+        """
+        Creates a note from stored values without validating them.
+
+        Parameters:
+        *values: The stored values in the order of FIELDS.
+
+        Returns:
+        Note: The created note.
+        """
+        note = super().from_trusted(*values)
+        note._tags = NoteTags.parse(note._tags)
+        return note
 
     @property
     def tags(self):
         """
         Gets the content of the note tags.
         """
-        if not self.data["tags"]:
-            return []
-        return self.data["tags"].split(",")
+        return list(self._tags)
 
     @tags.setter
     def tags(self, tags):
@@ -113,12 +179,42 @@ class Note(UserDict):
         Sets the content of the note tags.
 
         Parameters:
-        tags (str if loaded from storage else list[str]): The content to be set.
+        tags (str if loaded from storage else Iterable[str]): The content to be set.
         """
         if isinstance(tags, str):
-            self.data["tags"] = tags
+            self._tags = NoteTags.parse(tags)
             return
-        self.data["tags"] = ",".join(tags)
+        self._tags = NoteTags(tags)
+
+    def has_tag(self, tag: str):
+        """
+        Checks whether the note has the tag. Tags are case-sensitive.
+
+        Parameters:
+        tag (str): The tag to be checked.
+
+        Returns:
+        bool: True if the note has the tag, False otherwise.
+        """
+        return tag in self._tags
+
+    def add_tag(self, tag: str):
+        """
+        Adds a tag to the note.
+
+        Parameters:
+        tag (str): The tag to be added.
+        """
+        self._tags.add(tag)
+
+    def remove_tag(self, tag: str):
+        """
+        Removes a tag from the note.
+
+        Parameters:
+        tag (str): The tag to be removed.
+        """
+        self._tags.discard(tag)
 
 
 class NotesManager(PersistantStorage):
@@ -127,39 +223,96 @@ class NotesManager(PersistantStorage):
 
     Inherits from PersistentStorage for CSV file operations.
 
+    The contents and the tags of the notes are kept in inverted indexes, so keyword and tag searches do not
+    scan the whole collection. Every mutating method keeps the indexes up to date.
+
     Attributes:
         data (list): A list to store the note records.
+        _contents (TextIndex): Index from the terms of the lowercased contents to the notes.
+        _tag_index (dict[str, set]): Index from the case-folded tag to the notes having it.
+        _tag_prefixes (PrefixTrie): Prefix index of the case-folded tags in use, for completion.
     """
 
-    def __init__(self):
+    def __init__(self, **storage_options):
         """
         Initializes a new NotesManager instance with specified column headers and note type.
+
+        Parameters:
+        **storage_options: Keyword arguments passed to PersistantStorage (e.g. journaled=True).
         """
-        super().__init__("notes.csv", ["id", "timestamp", "content", "tags"], Note)
+        super().__init__(
+            "notes.csv", ["id", "timestamp", "content", "tags"], Note, **storage_options
+        )
+        self._contents = TextIndex()
+        self._tag_index = {}
+        self._tag_prefixes = PrefixTrie()
 
-    def _get_available_ids(self):
+    def _build_indexes(self):
+        """
+        Builds the content and tag indexes for all the loaded notes.
         """
-        Get the available note IDs.
+        self._contents = TextIndex()
+        self._tag_index = {}
+        self._tag_prefixes = PrefixTrie()
+        for note in self._elements():
+            self._contents.add(note, note.content.lower())
+            for tag in note.tags:
+                self._index_tag(note, tag)
 
-        Returns:
-        tuple: A tuple containing the available note IDs.
+    def _index_tag(self, note: Note, tag: str):
         """
-        if not self.data:
-            return ()
-        return tuple(range(0, len(self.data)))
+        Adds a note to the tag index under the given tag.
 
-    def _update_ids(self):
+        Parameters:
+        - note (Note): The note having the tag.
+        - tag (str): The tag.
         """
-        Update the IDs of all notes in the storage to match their current positions.
+        key = tag.casefold()
+        notes = self._tag_index.get(key)
+        if notes is None:
+            notes = self._tag_index[key] = set()
+            self._tag_prefixes.add(key, tag)
+        notes.add(note)
 
-        This function is typically called after notes have been added or deleted, ensuring
-        that the IDs of the remaining notes reflect their sequential order in the storage.
+    def _unindex_tag(self, note: Note, tag: str):
+        """
+        Removes a note from the tag index under the given tag, unless the note has another tag equal to it
+        when case-folded.
+
+        Parameters:
+        - note (Note): The note which had the tag.
+        - tag (str): The tag.
+        """
+        key = tag.casefold()
+        if any(t.casefold() == key for t in note.tags):
+            return
+        notes = self._tag_index.get(key)
+        if notes is None:
+            return
+        notes.discard(note)
+        if not notes:
+            del self._tag_index[key]
+            self._tag_prefixes.remove(key)
+
+    def complete_tags(self, prefix: str, limit: int, id: str = None):
+        """
+        Finds the tags starting with the given prefix, for the completion of tag arguments.
+
+        Parameters:
+        - prefix (str): The typed beginning of the tag, in any case.
+        - limit (int): The maximal number of results.
+        - id (str, optional): The ID of a note to complete only its own tags. Defaults to all the tags in use.
 
         Returns:
-        None
+        list: The matching tags, ordered by their case-folded form.
         """
-        for id in range(len(self.data)):
-            self.data[id].id = id
+        key = prefix.casefold()
+        if id is None:
+            return self._tag_prefixes.complete(key, limit)
+        if not id.isdigit() or not self._has_id(int(id)):
+            return []
+        tags = sorted(self._get_element(int(id)).tags, key=str.casefold)
+        return [tag for tag in tags if tag.casefold().startswith(key)][:limit]
 
     def _check_note_ids(self, id: int = None):
         """
@@ -172,13 +325,16 @@ class NotesManager(PersistantStorage):
         - EmptyNotesError: If the notes list is empty.
         - InvalidNoteOrContactIDError: If the provided note ID is invalid.
         """
-        ids = self._get_available_ids()
-        if not ids:
+        count = self._count()
+        if not count:
             raise EmptyNotesError("Error: Notes list is empty.")
-        if id and id not in ids:
-            error_msg = f"Error: Invalid note Id. Possible Ids: 0."
-            if len(ids) > 1:
-                error_msg = error_msg[:-1] + f"-{len(ids)-1}"
+        if id is not None and not self._has_id(id):
+            if self.stable_ids:
+                error_msg = f"Error: Invalid note Id: {id}."
+            else:
+                error_msg = f"Error: Invalid note Id. Possible Ids: 0."
+                if count > 1:
+                    error_msg = error_msg[:-1] + f"-{count-1}"
             raise InvalidNoteOrContactIDError(error_msg)
 
     def _check_empty_result(self, content: list):
@@ -223,13 +379,13 @@ class NotesManager(PersistantStorage):
         """
         id = Id(id).value
         self._check_note_ids(id)
-        tags = self.data[id].tags
+        has_tag = self._get_element(id).has_tag(tag)
         if must_exist:
-            if tag not in tags:
+            if not has_tag:
                 raise TagIsAbsentError(
                     f"Error: Tag '{tag}' is not present in the note with Id: {id}. Tags are case-sensitive."
                 )
-        elif tag in tags:
+        elif has_tag:
             raise TagIsPresentError(
                 f"Error: Tag '{tag}' is already added to the note with Id: {id}."
             )
@@ -249,10 +405,12 @@ class NotesManager(PersistantStorage):
         str: A message indicating the success of adding the note.
         """
         self._check_empty_content(content)
-        id = len(self.data)
+        id = self._allocate_id()
         timestamp = datetime.now().strftime("%d.%m.%Y %H:%M:%S")
         note = Note(id, timestamp, content)
-        self.data.append(note)
+        self._append_element(note)
+        self._contents.add(note, content.lower())
+        self._stage_put(note)
         return f"Note added with Id: {id} at {note.timestamp}"
 
     def find_notes(self, keyword: str):
@@ -269,8 +427,14 @@ class NotesManager(PersistantStorage):
         list: A list of notes containing the specified keyword.
         """
         self._check_empty_content(keyword)
+        keyword = keyword.lower()
+        candidates = self._contents.search(keyword)
+        if candidates is None:
+            candidates = self._elements()
+        else:
+            candidates = sorted(candidates, key=lambda note: note.id)
         result = list(
-            filter(lambda note: keyword.lower() in note.content.lower(), self.data)
+            filter(lambda note: keyword in note.content.lower(), candidates)
         )
         self._check_empty_result(result)
         return result
@@ -283,10 +447,10 @@ class NotesManager(PersistantStorage):
         - EmptyNotesError: If the notes list is empty.
 
         Returns:
-        list: A list containing all notes.
+        Iterator: The notes in the order of their IDs. They are produced while being consumed.
         """
         self._check_note_ids()
-        return self.data
+        return self._elements()
 
     @PersistantStorage.update
     def edit_note(self, id: str, new_content: str):
@@ -305,9 +469,12 @@ class NotesManager(PersistantStorage):
         """
         id = Id(id).value
         self._check_note_ids(id)
-        current_note = self.data[id]
+        current_note = self._get_element(id)
+        self._contents.remove(current_note, current_note.content.lower())
         current_note.content = new_content
+        self._contents.add(current_note, new_content.lower())
         current_note.timestamp = datetime.now().strftime("%d.%m.%Y %H:%M:%S")
+        self._stage_put(current_note)
         return f"Note edited. New version: {current_note.timestamp}: {current_note.content}"
 
     @PersistantStorage.update
@@ -326,8 +493,13 @@ class NotesManager(PersistantStorage):
         """
         id = Id(id).value
         self._check_note_ids(id)
-        self.data.pop(id)
-        self._update_ids()
+        note = self._remove_element(id)
+        self._contents.remove(note, note.content.lower())
+        tags = note.tags
+        note.tags = ()
+        for tag in tags:
+            self._unindex_tag(note, tag)
+        self._stage_delete(id)
         return f"Note with Id {id} deleted successfully."
 
     @PersistantStorage.update
@@ -349,10 +521,11 @@ class NotesManager(PersistantStorage):
         id = Id(id).value
         self._check_note_ids(id)
         self._check_tag_exists(id, tag, False)
-        tags = self.data[id].tags
-        tags.append(tag)
-        self.data[id].tags = tags
-        self.data[id].timestamp = datetime.now().strftime("%d.%m.%Y %H:%M:%S")
+        note = self._get_element(id)
+        note.add_tag(tag)
+        self._index_tag(note, tag)
+        note.timestamp = datetime.now().strftime("%d.%m.%Y %H:%M:%S")
+        self._stage_put(note)
         return f"Tag '{tag}' added to the note with Id: {id}"
 
     @PersistantStorage.update
@@ -374,9 +547,10 @@ class NotesManager(PersistantStorage):
         id = Id(id).value
         self._check_note_ids(id)
         self._check_tag_exists(id, tag, True)
-        tags = self.data[id].tags
-        tags.remove(tag)
-        self.data[id].tags = tags
+        note = self._get_element(id)
+        note.remove_tag(tag)
+        self._unindex_tag(note, tag)
+        self._stage_put(note)
         return f"Tag '{tag}' deleted from the note with Id: {id}"
 
     @PersistantStorage.update
@@ -399,12 +573,32 @@ class NotesManager(PersistantStorage):
         id = Id(id).value
         self._check_note_ids(id)
         self._check_tag_exists(id, tag, True)
-        tags = self.data[id].tags
-        tags.remove(tag)
-        tags.append(new_tag)
-        self.data[id].tags = tags
+        note = self._get_element(id)
+        note.remove_tag(tag)
+        self._unindex_tag(note, tag)
+        note.add_tag(new_tag)
+        self._index_tag(note, new_tag)
+        self._stage_put(note)
         return f"Tag '{tag}' replaced by '{new_tag}' in the note with Id: {id}"
 
+    def export_notes(self, path: str, tag: str = None):
+        """
+        Export the notes to a CSV or a JSON lines file, optionally gzip-compressed.
+
+        Parameters:
+        - path (str): The path of the file, e.g. 'notes.csv' or 'notes.jsonl.gz'.
+        - tag (str, optional): The tag to export only the notes having it.
+
+        Raises:
+        - InvalidDataFileError: If the format of the file is unknown or the file can not be written.
+        - NoResultsFoundError: If no notes have the tag.
+
+        Returns:
+        int: The number of exported notes.
+        """
+        notes = None if tag is None else self.find_notes_by_tag(tag)
+        return self.export(path, notes)
+
     def find_notes_by_tag(self, tag: str):
         """
         Find notes that have the specified tag.
@@ -418,10 +612,7 @@ class NotesManager(PersistantStorage):
         Returns:
         list: A list of notes that have the specified tag.
         """
-        result = []
-        for note in self.data:
-            for t in note.tags:
-                if tag.lower() == t.lower():
-                    result.append(note)
+        notes = self._tag_index.get(tag.casefold(), ())
+        result = sorted(notes, key=lambda note: note.id)
         self._check_empty_result(result)
         return result
@@ -1,5 +1,29 @@
-from rich.console import Console
-from rich.table import Table
+import sys
+from itertools import chain, islice
+
+TABLE_PAGE_SIZE = 100
+STREAM_PAGE_SIZE = 1000
+TABLE_FORMATS = ("table", "tsv", "jsonl")
+TSV_ESCAPES = str.maketrans("\t\n\r", "   ")
+
+_console = None
+
+
+def get_console():
+    """
+    Gets the console shared by all the formatters, creating it on the first use.
+
+    The 'rich' library is imported only here, so commands producing plain output never load it.
+
+    Returns:
+    Console: The shared instance of the Console class from the 'rich' library.
+    """
+    global _console
+    if _console is None:
+        from rich.console import Console
+
+        _console = Console()
+    return _console
 
 
 class OutputFormatter:
@@ -8,15 +32,62 @@ class OutputFormatter:
 
     This class provides methods to print various types of messages (input prompts, greetings, information, errors) and tables with custom styles.
 
+    In plain mode nothing is styled: messages are written as they are, errors go to the standard error stream
+    and tables are written as tab-separated lines, which suits scripts reading the output.
+
+    Tables are printed in one of the TABLE_FORMATS: 'table' lays them out with rich, 'tsv' and 'jsonl' stream
+    the rows as tab-separated lines or as JSON objects, one per line, straight to the output stream. The format
+    is chosen for the formatter and can be overridden for a single table. Plain mode never uses 'table'.
+
+    All the formatters share a single console, which is created on the first styled output.
+
     Attributes:
-        console (Console): An instance of the Console class from the 'rich' library for formatted console output.
+        console (Console): The shared instance of the Console class from the 'rich' library for formatted console output.
+        plain (bool): Whether the output is written without any styling.
+        stdout: The stream for the plain output, or None for the standard output.
+        stderr: The stream for the plain error messages, or None for the standard error stream.
+        errors (int): The number of errors printed so far.
+        table_format (str): The format of the printed tables: 'table', 'tsv' or 'jsonl'.
     """
 
-    def __init__(self):
+    def __init__(self, plain: bool = False, stdout=None, stderr=None, table_format: str = None):
+        """
+        Initializes an OutputFormatter instance.
+
+        Parameters:
+        plain (bool, optional): Writes the output without any styling. Defaults to False.
+        stdout (optional): The stream for the plain output. Defaults to the standard output.
+        stderr (optional): The stream for the plain error messages. Defaults to the standard error stream.
+        table_format (str, optional): The format of the printed tables. Defaults to 'tsv' in plain mode and
+            to 'table' otherwise.
+
+        Raises:
+        ValueError: If the table format is unknown.
+        """
+        if table_format is not None and table_format not in TABLE_FORMATS:
+            raise ValueError(f"Unknown table format: {table_format}")
+        self.plain = plain
+        self.stdout = stdout
+        self.stderr = stderr
+        self.errors = 0
+        self.table_format = table_format or ("tsv" if plain else "table")
+
+    @property
+    def console(self):
+        """
+        Gets the shared console, creating it on the first use.
+        """
+        return get_console()
+
+    def _write(self, text: str, stream=None):
         """
-        Initializes an OutputFormatter instance with a Console object.
+        Writes a line of plain text.
+
+        Parameters:
+        text (str): The text to be written.
+        stream (optional): The stream to write to. Defaults to the output stream of the formatter.
         """
-        self.console = Console()
+        (stream or self.stdout or sys.stdout).write(f"{text}\n")
 
     def print_input(self, text):
         """
@@ -26,6 +97,9 @@ class OutputFormatter:
         text (str): The text to be printed as an input prompt.
         """
         if isinstance(text, str):
+            if self.plain:
+                self._write(text)
+                return
             self.console.print(f"[yellow]{text}[/yellow]")
 
     def print_greeting(self, text):
@@ -36,6 +110,9 @@ class OutputFormatter:
         text (str): The text to be printed as a greeting message.
         """
         if isinstance(text, str):
+            if self.plain:
+                self._write(text)
+                return
             self.console.print(f"[bold cyan]{text}[/bold cyan]")
 
     def print_info(self, text):
@@ -46,6 +123,9 @@ class OutputFormatter:
         text (str): The text to be printed as an informational message.
         """
         if isinstance(text, str):
+            if self.plain:
+                self._write(text)
+                return
             self.console.print(f"[bold green]{text}[/bold green]")
 
     def print_error(self, error):
@@ -56,27 +136,118 @@ class OutputFormatter:
         error (str): The text to be printed as an error message.
         """
         if isinstance(error, (str, Exception)):
+            self.errors += 1
+            if self.plain:
+                self._write(error, self.stderr or sys.stderr)
+                return
             self.console.print(f"[bold red]{error}[/bold red]")
 
-    def print_table(self, data):
+    @staticmethod
+    def __column_widths(headers: list, cells: list):
         """
-        Prints a table with the provided data.
+        Computes the column widths of a table from its headers and its first rows.
+
+        Later rows may hold longer values, e.g. growing IDs, so every column gets a quarter more than its longest
+        line, and at least one more cell. rich still narrows the columns if the table does not fit the console.
 
         Parameters:
-        data (list): A list of dictionaries, where each dictionary represents a row in the table.
+        headers (list[str]): The column headers.
+        cells (list[list[str]]): The values of the first rows.
+
+        Returns:
+        list[int]: The width of every column.
         """
-        if isinstance(data, list):
-            column_colors = ["cyan" for _ in range(len(data[0].keys()))]
-            header_color = "bold green"
+        from rich.cells import cell_len
 
-            table = Table(show_header=True, header_style=header_color)
+        widths = []
+        for header, column in zip(headers, zip(*cells)):
+            longest = max(cell_len(line) for value in [header, *column] for line in value.splitlines() or [""])
+            widths.append(longest + max(1, longest // 4))
+        return widths
 
-            headers = list(data[0].keys())
+    def __stream_rows(self, rows, headers: list, table_format: str):
+        """
+        Writes the rows of a table as tab-separated lines with a header line, or as JSON lines.
+
+        Nothing is measured or styled. The lines of STREAM_PAGE_SIZE rows are joined and written at once.
+
+        Parameters:
+        rows (Iterator): The rows of the table.
+        headers (list[str]): The keys of the values in every row.
+        table_format (str): Either 'tsv' or 'jsonl'.
+        """
+        stream = self.stdout or sys.stdout
+        if table_format == "jsonl":
+            import json
 
-            for header, color in zip(headers, column_colors):
-                table.add_column(header.capitalize(), style=color)
+            encode = json.JSONEncoder().encode
 
-            for item in data:
-                table.add_row(*[str(item.get(header, "")) for header in headers])
+            def line(item):
+                values = {}
+                for header in headers:
+                    value = item.get(header, "")
+                    values[header] = value if isinstance(value, int) else str(value)
+                return encode(values)
 
-            self.console.print(table)
+        else:
+            stream.write("\t".join(headers) + "\n")
+
+            def line(item):
+                # Tabs and line breaks inside the values would break the lines into wrong cells
+                return "\t".join(str(item.get(header, "")).translate(TSV_ESCAPES) for header in headers)
+
+        for page in iter(lambda: list(islice(rows, STREAM_PAGE_SIZE)), []):
+            stream.write("\n".join(map(line, page)) + "\n")
+
+    def print_table(self, data, page_size: int = TABLE_PAGE_SIZE, table_format: str = None):
+        """
+        Prints a table with the provided data.
+
+        The rows are consumed one page at a time and every page is printed as soon as the next one is read, so
+        the first rows appear immediately even for a huge result produced by an iterator. Every page is a rich
+        table whose column widths are fixed by the first page (longer values are wrapped), so all the pages line
+        up and read as a single table.
+        The 'tsv' and 'jsonl' formats bypass rich and stream the rows instead (see __stream_rows).
+
+        Parameters:
+        data (Iterable): The rows of the table. Every row is a dictionary or a record with the keys() and get()
+            methods. The headers are taken from the first row.
+        page_size (int, optional): The number of rows rendered at once. Defaults to TABLE_PAGE_SIZE.
+        table_format (str, optional): The format of this table. Defaults to the format of the formatter.
+        """
+        if data is None or isinstance(data, str):
+            return
+        rows = iter(data)
+        first = next(rows, None)
+        if first is None:
+            return
+        headers = list(first.keys())
+        rows = chain([first], rows)
+
+        table_format = table_format or self.table_format
+        if table_format != "table" or self.plain:
+            self.__stream_rows(rows, headers, "tsv" if table_format == "table" else table_format)
+            return
+
+        from rich.segment import Segments
+        from rich.table import Table
+
+        pages = iter(
+            lambda: [[str(item.get(header, "")) for header in headers] for item in islice(rows, page_size)], []
+        )
+        cells = next(pages)
+        widths = self.__column_widths(headers, cells)
+        first_page = True
+        while cells:
+            # The next page is read ahead, so the bottom border is only drawn under the last one
+            following = next(pages, None)
+            table = Table(show_header=first_page, header_style="bold green")
+            for header, width in zip(headers, widths):
+                table.add_column(header.capitalize(), style="cyan", width=width)
+            for row in cells:
+                table.add_row(*row)
+            lines = self.console.render_lines(table, pad=False, new_lines=True)
+            # Every page is a table of its own; the borders between the pages are cut, so they read as one
+            lines = lines[0 if first_page else 1 : None if following is None else -1]
+            self.console.print(Segments(segment for line in lines for segment in line))
+            cells, first_page = following, False
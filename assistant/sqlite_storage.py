@@ -0,0 +1,182 @@
+from pathlib import Path
+
+
+class SqliteEngine:
+    """
+    A storage engine keeping the elements of a PersistantStorage in a table of an SQLite database.
+
+    Every applied batch of changes is written in its own transaction, so a change is either stored
+    completely or not at all. The elements are always loaded completely and searched in memory, so the table
+    has no indexes but its primary key. The format version of every table and the next ID to allocate in it
+    are kept in a separate metadata table.
+
+    Attributes:
+        path (Path): The path to the database file.
+        table (str): The name of the table used for the elements.
+        fields (list[str]): The columns of the table. The first one is the integer primary key.
+        synchronous (str): The synchronous mode of the database: 'OFF', 'NORMAL' or 'FULL'.
+        connection (sqlite3.Connection): The connection to the database, opened by open().
+    """
+
+    DATABASE_FILENAME = "assistant.db"
+    META_TABLE = "storage_meta"
+
+    def __init__(self, path: Path, table: str, fields: list[str], synchronous: str = "FULL"):
+        """
+        Initializes a new SqliteEngine instance.
+
+        Parameters:
+        path (Path): The path to the database file.
+        table (str): The name of the table used for the elements.
+        fields (list[str]): The columns of the table. The first one is the integer primary key.
+        synchronous (str, optional): How often SQLite syncs the writes to the disk: 'OFF', 'NORMAL' or 'FULL'.
+            Defaults to 'FULL'.
+        """
+        self.path = path
+        self.table = table
+        self.fields = fields
+        self.synchronous = synchronous
+        self.connection = None
+
+    def open(self):
+        """
+        Opens the database and creates the table if it does not exist yet.
+        """
+        # Imported here, so the CSV backend does not pay for loading the SQLite library
+        import sqlite3
+
+        # The storage serializes the access, but may write from its background writer thread
+        self.connection = sqlite3.connect(self.path, check_same_thread=False)
+        self.connection.execute(f"PRAGMA synchronous = {self.synchronous}")
+        key, *columns = self.fields
+        columns_sql = ", ".join([f"{key} INTEGER PRIMARY KEY"] + [f"{c} TEXT" for c in columns])
+        with self.connection:
+            self.connection.execute(f"CREATE TABLE IF NOT EXISTS {self.table} ({columns_sql})")
+            self.connection.execute(
+                f"CREATE TABLE IF NOT EXISTS {self.META_TABLE} "
+                "(name TEXT PRIMARY KEY, format INTEGER, next_id INTEGER)"
+            )
+            meta_columns = {row[1] for row in self.connection.execute(f"PRAGMA table_info({self.META_TABLE})")}
+            if "next_id" not in meta_columns:
+                # Databases written before the next ID was kept
+                self.connection.execute(f"ALTER TABLE {self.META_TABLE} ADD COLUMN next_id INTEGER")
+            # Databases written by older versions have indexes no query uses, which only slow down the writes
+            unused = self.connection.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = ? AND sql IS NOT NULL",
+                (self.table,),
+            ).fetchall()
+            for (index,) in unused:
+                self.connection.execute(f"DROP INDEX IF EXISTS {index}")
+
+    @property
+    def format_version(self):
+        """
+        Gets the format version the table was written with, or None if it is unknown.
+        """
+        row = self.connection.execute(
+            f"SELECT format FROM {self.META_TABLE} WHERE name = ?", (self.table,)
+        ).fetchone()
+        return row[0] if row else None
+
+    @property
+    def next_id(self):
+        """
+        Gets the next ID to allocate in the table, or None if it was never recorded.
+        """
+        row = self.connection.execute(
+            f"SELECT next_id FROM {self.META_TABLE} WHERE name = ?", (self.table,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def __set_meta(self, column: str, value: int):
+        """
+        Records a metadata value of the table, keeping the other ones. Runs in the transaction of the caller.
+
+        Parameters:
+        column (str): The column of the metadata table: 'format' or 'next_id'.
+        value (int): The value.
+        """
+        self.connection.execute(
+            f"INSERT INTO {self.META_TABLE} (name, {column}) VALUES (?, ?) "
+            f"ON CONFLICT(name) DO UPDATE SET {column} = excluded.{column}",
+            (self.table, value),
+        )
+
+    def set_format_version(self, version: int):
+        """
+        Records the format version of the table.
+
+        Parameters:
+        version (int): The format version.
+        """
+        with self.connection:
+            self.__set_meta("format", version)
+
+    def close(self):
+        """
+        Closes the database connection.
+        """
+        if self.connection:
+            self.connection.close()
+            self.connection = None
+
+    def load(self):
+        """
+        Loads all rows of the table ordered by their key.
+
+        Returns:
+        Iterator[tuple]: The rows with the values in the order of the fields.
+        """
+        return self.connection.execute(
+            f"SELECT {', '.join(self.fields)} FROM {self.table} ORDER BY {self.fields[0]}"
+        )
+
+    def apply(self, changes: list[list[str]], renumber: bool = True, next_id: int = None):
+        """
+        Applies staged changes in a single transaction.
+
+        Parameters:
+        changes (list[list[str]]): The staged changes: ['put', *values] or ['del', id].
+        renumber (bool, optional): Whether the keys following a deleted row are shifted down. Defaults to True.
+        next_id (int, optional): The next ID to allocate, recorded in the same transaction. Not recorded if None.
+        """
+        key = self.fields[0]
+        put_sql = (
+            f"INSERT OR REPLACE INTO {self.table} ({', '.join(self.fields)}) "
+            f"VALUES ({', '.join('?' for _ in self.fields)})"
+        )
+        with self.connection:
+            for op, *values in changes:
+                if op == "put":
+                    self.connection.execute(put_sql, values)
+                elif op == "del":
+                    id = int(values[0])
+                    self.connection.execute(f"DELETE FROM {self.table} WHERE {key} = ?", (id,))
+                    if renumber:
+                        # Two steps, so that shifted keys never collide with the rows not shifted yet
+                        self.connection.execute(
+                            f"UPDATE {self.table} SET {key} = -({key} - 1) WHERE {key} > ?", (id,)
+                        )
+                        self.connection.execute(
+                            f"UPDATE {self.table} SET {key} = -{key} WHERE {key} < 0"
+                        )
+            if next_id is not None:
+                self.__set_meta("next_id", next_id)
+
+    def replace_all(self, rows, next_id: int = None):
+        """
+        Replaces all rows of the table in a single transaction.
+
+        Parameters:
+        rows (Iterable[list[str]]): The new rows with the values in the order of the fields.
+        next_id (int, optional): The next ID to allocate, recorded in the same transaction. Not recorded if None.
+        """
+        put_sql = (
+            f"INSERT INTO {self.table} ({', '.join(self.fields)}) "
+            f"VALUES ({', '.join('?' for _ in self.fields)})"
+        )
+        with self.connection:
+            self.connection.execute(f"DELETE FROM {self.table}")
+            self.connection.executemany(put_sql, rows)
+            if next_id is not None:
+                self.__set_meta("next_id", next_id)
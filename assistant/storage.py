@@ -1,7 +1,100 @@
 import csv
+import io
+import json
+import os
+import threading
+import zlib
 from collections import UserList
+from contextlib import contextmanager
+from itertools import islice
+from json.encoder import encode_basestring_ascii as quote
+from operator import attrgetter
 from pathlib import Path
 
+from assistant.error_handler import InvalidDataFileError, TransactionError
+from assistant.sqlite_storage import SqliteEngine
+
+
+class StoredRecord:
+    """
+    A base class for compact elements kept in a PersistantStorage.
+
+    Subclasses list their field names in FIELDS and keep the validated value of every field in a slot named
+    after the field with a leading underscore. No per-instance dictionary and no per-field objects are created.
+    A read-only dictionary-like view of the values (data, keys, get, item access) is provided for the storage
+    and the output formatting.
+
+    Attributes:
+        FIELDS (tuple[str]): The names of the fields in the storage order.
+    """
+
+    __slots__ = ()
+    FIELDS = ()
+
+    @property
+    def data(self):
+        """
+        Gets a dictionary with the stored values of all the fields.
+        """
+        return {field: getattr(self, "_" + field) for field in self.FIELDS}
+
+    def keys(self):
+        """
+        Gets the field names.
+        """
+        return self.FIELDS
+
+    def get(self, key: str, default=None):
+        """
+        Gets the stored value of a field.
+
+        Parameters:
+        key (str): The field name.
+        default (optional): The value returned for an unknown field. Defaults to None.
+        """
+        if key not in self.FIELDS:
+            return default
+        return getattr(self, "_" + key)
+
+    def __getitem__(self, key: str):
+        if key not in self.FIELDS:
+            raise KeyError(key)
+        return getattr(self, "_" + key)
+
+    def __iter__(self):
+        return iter(self.FIELDS)
+
+    def __len__(self):
+        return len(self.FIELDS)
+
+    @classmethod
+    def from_trusted(cls, *values):
+        """
+        Creates an element from stored values without validating them.
+
+        Only the ID is converted to an integer. Use it for data the assistant has written itself.
+
+        Parameters:
+        *values: The stored values in the order of FIELDS.
+
+        Returns:
+        StoredRecord: The created element.
+        """
+        element = cls.__new__(cls)
+        for field, value in zip(cls.FIELDS, values):
+            setattr(element, "_" + field, value)
+        element._id = int(element._id)
+        return element
+
+    def validate(self):
+        """
+        Validates and normalizes the stored values by passing them through the field setters.
+
+        Raises:
+        FieldValidationError: If a value does not pass the validation.
+        """
+        type(self).__init__(self, *(getattr(self, "_" + field) for field in self.FIELDS))
+
 
 class PersistantStorage(UserList):
     """
@@ -9,14 +102,105 @@ class PersistantStorage(UserList):
 
     This class manages reading from and writing to a CSV file to ensure data persistence across sessions. It uses UserList for easy manipulation of data as a list.
 
+    In journaled mode every mutation appends a small record to a journal file next to the CSV file instead of
+    rewriting the whole CSV file. The CSV snapshot is rebuilt only at checkpoints, and the journal is replayed
+    on top of the snapshot when the storage is opened.
+
+    Elements are looked up by their ID through an ID to slot dictionary. By default IDs are positional: deleting
+    an element renumbers all the following ones. In stable ID mode IDs are allocated monotonically and never change,
+    and a deleted element only leaves a tombstone (None) in its slot. Tombstones are reclaimed by compact().
+
+    With the 'sqlite' backend the elements are kept in a table of an SQLite database instead of the CSV file,
+    and every change is written to the database in its own transaction.
+
+    Changes are written according to the write policy: after every update ('immediate'), by a background
+    thread every N milliseconds ('interval:N') or after every N updates ('count:N'), or only when the storage is
+    flushed or closed ('exit'). Updates and flushes are serialized by a lock. With the journal or the database
+    the background thread writes without holding the data, so updates do not wait for the disk.
+
+    Changes can be grouped into a transaction with begin() and commit(), or the transaction() context manager.
+    The changes of a transaction are kept in memory and persisted by a single write when it is committed;
+    in the journal they are enclosed in records marking the transaction, so a transaction interrupted by a crash
+    is not replayed at all. rollback() discards them and loads the persisted data again.
+
+    Every CSV snapshot is accompanied by a small metadata file with the format version, the checksum and the
+    generation of the snapshot. Snapshots that match their metadata were written by the assistant itself, so their
+    rows are loaded without running the field validation again. Other files are validated while loading.
+
+    Snapshots are written to a temporary file which then replaces the old snapshot, so a crash never leaves
+    a partially written snapshot behind. The journal starts with the generation of the snapshot it belongs to;
+    a journal left behind by a crash during a checkpoint is older than the snapshot and is not replayed again.
+    The fsync policy selects how much survives a power loss: 'none' leaves the writes to the operating system,
+    'data' syncs the snapshots and the journal records before they are relied on, 'full' additionally syncs
+    the data directory after replacing the files. With the 'sqlite' backend the policy selects the
+    synchronous mode of the database.
+
     Attributes:
         filename (str): The name of the file where data is stored.
         fields (list[str]): The fields (columns) in the CSV file.
         load_type (type): The type to which the loaded data will be converted.
-        __dict_file_handle: Internal handle for the opened file.
+        backend (str): The storage backend, either 'csv' or 'sqlite'.
+        journaled (bool): Whether mutations are appended to the journal instead of rewriting the CSV file.
+        checkpoint_interval (int): The minimal number of journal records after which the CSV snapshot is rebuilt.
+            The snapshot is not rebuilt before the journal gets as long as the storage either.
+        stable_ids (bool): Whether IDs are kept on deletion instead of renumbering the elements.
+        validation (str): When loaded rows are validated: 'eager' or 'trusted'.
+        write_policy (str): When changes are written: 'immediate', 'interval', 'count' or 'exit'.
+        write_policy_value (int): The interval in milliseconds or the number of updates of the write policy.
+        fsync_policy (str): How the writes are synced to the disk: 'none', 'data' or 'full'.
+        _slots (dict): Index from the element ID to its position in data.
+        _next_id (int): The ID for the next added element in stable ID mode.
+        _tombstones (int): The number of deleted elements still occupying a slot.
+        __snapshot_opened (bool): Internal flag telling whether the CSV storage was opened.
+        __generation (int): Internal generation of the current CSV snapshot.
+        __snapshot_matched (bool): Internal flag telling whether the loaded snapshot matched its metadata.
+        __journal_file_handle: Internal handle for the opened journal file.
+        __engine (SqliteEngine): Internal database engine used by the 'sqlite' backend.
+        __lock (threading.RLock): Internal lock of the data and the staged changes.
+        __write_lock (threading.RLock): Internal lock serializing the writes to the files. It is always taken
+            before the data lock.
+        __flusher (threading.Thread): Internal background thread of the 'interval' and 'count' write policies.
+        __in_transaction (bool): Internal flag telling whether a transaction is open.
     """
 
-    def __init__(self, filename: str, fields: list[str], load_type):
+    BACKENDS = ("csv", "sqlite")
+
+    FORMAT_VERSION = 1
+    VALIDATION_MODES = ("eager", "trusted")
+
+    META_SUFFIX = ".meta"
+    TEMP_SUFFIX = ".tmp"
+    JOURNAL_SUFFIX = ".journal"
+    JOURNAL_END_MARKER = "$"
+    JOURNAL_GENERATION = "gen"
+    JOURNAL_BEGIN = "begin"
+    JOURNAL_COMMIT = "commit"
+    JOURNAL_CHECKPOINT_INTERVAL = 1000
+
+    WRITE_POLICIES = ("immediate", "interval", "count", "exit")
+    WRITE_POLICY_DEFAULTS = {"interval": 200, "count": 10}
+
+    FSYNC_POLICIES = ("none", "data", "full")
+    SQLITE_SYNCHRONOUS = {"none": "OFF", "data": "NORMAL", "full": "FULL"}
+
+    FILE_FORMATS = {".csv": "csv", ".jsonl": "jsonl", ".ndjson": "jsonl"}
+    EXPORT_PAGE_SIZE = 1000
+    EXPORT_BUFFER_SIZE = 1024 * 1024
+    EXPORT_COMPRESSION = 6
+
+    def __init__(
+        self,
+        filename: str,
+        fields: list[str],
+        load_type,
+        backend: str = "csv",
+        journaled: bool = False,
+        checkpoint_interval: int = JOURNAL_CHECKPOINT_INTERVAL,
+        stable_ids: bool = False,
+        validation: str = "trusted",
+        write_policy: str = "immediate",
+        fsync_policy: str = "data",
+    ):
         """
         Initializes a new PersistentStorage instance.
 
@@ -24,81 +208,1020 @@ class PersistantStorage(UserList):
         filename (str): The name of the file to use for storing data.
         fields (list[str]): A list of strings representing the fields in the CSV file.
         load_type (type): The type of object to be created for each row in the CSV file.
+        backend (str, optional): The storage backend, either 'csv' or 'sqlite'. Defaults to 'csv'.
+        journaled (bool, optional): Enables the append-only journal. Defaults to False.
+        checkpoint_interval (int, optional): The number of journal records between CSV snapshot rebuilds.
+        stable_ids (bool, optional): Keeps IDs on deletion instead of renumbering. Defaults to False.
+        validation (str, optional): 'eager' validates every loaded row, 'trusted' skips the validation of
+            files written by the assistant. Defaults to 'trusted'.
+        write_policy (str, optional): 'immediate' writes the changes after every update, 'interval:N' every
+            N milliseconds and 'count:N' after every N updates from a background thread, 'exit' only on flush()
+            and when the storage is closed. Defaults to 'immediate'.
+        fsync_policy (str, optional): 'none' does not sync the writes to the disk, 'data' syncs the written
+            files, 'full' syncs the data directory too. Defaults to 'data'.
         """
+        if backend not in self.BACKENDS:
+            raise ValueError(f"Unknown storage backend: {backend}")
+        if validation not in self.VALIDATION_MODES:
+            raise ValueError(f"Unknown validation mode: {validation}")
+        policy, _, policy_value = write_policy.partition(":")
+        if policy not in self.WRITE_POLICIES:
+            raise ValueError(f"Unknown write policy: {write_policy}")
+        policy_value = int(policy_value) if policy_value else self.WRITE_POLICY_DEFAULTS.get(policy, 0)
+        if policy in self.WRITE_POLICY_DEFAULTS and policy_value < 1:
+            raise ValueError(f"The write policy value must be positive: {write_policy}")
+        if fsync_policy not in self.FSYNC_POLICIES:
+            raise ValueError(f"Unknown fsync policy: {fsync_policy}")
         super().__init__()
         self.filename = filename
         self.fields = fields
         self.load_type = load_type
-        self.__dict_file_handle = None
+        self.backend = backend
+        self.journaled = journaled
+        self.checkpoint_interval = checkpoint_interval
+        self.stable_ids = stable_ids
+        self.validation = validation
+        self.write_policy = policy
+        self.write_policy_value = policy_value
+        self.fsync_policy = fsync_policy
+        self._slots = {}
+        self._next_id = 0
+        self._tombstones = 0
+        self.__snapshot_opened = False
+        self.__generation = 0
+        self.__persisted_next_id = 0
+        self.__snapshot_matched = False
+        self.__journal_file_handle = None
+        self.__journal_records = 0
+        self.__journal_damaged = False
+        self.__pending_changes = []
+        self.__engine = None
+        self.__values = attrgetter(*("_" + field for field in fields))
+        self.__lock = threading.RLock()
+        self.__write_lock = threading.RLock()
+        self.__flusher = None
+        self.__flusher_wakeup = threading.Event()
+        self.__closing = False
+        self.__updates = 0
+        self.__in_transaction = False
 
-    def __open_file(self, modes: str):
+    def __data_path(self, filename: str):
+        """
+        Gets the path of a file in the assistant data directory, creating the directory if needed.
+
+        Parameters:
+        filename (str): The name of the file.
+
+        Returns:
+        Path: The path of the file.
+        """
+        data_dir = Path.home().resolve() / ".assistant"
+        data_dir.mkdir(parents=True, exist_ok=True)
+        return data_dir / filename
+
+    def __open_file(self, modes: str, filename: str = None):
         """
         Opens the file with the specified mode.
 
         Parameters:
         modes (str): The file opening mode (e.g., 'r+', 'w').
+        filename (str, optional): The name of the file to open. Defaults to the storage file name.
 
         Returns:
         file: The file object opened in the specified mode.
         """
-        data_dir = Path.home().resolve() / ".assistant"
-        data_dir.mkdir(parents=True, exist_ok=True)
-        file_path = data_dir / self.filename
-        return open(file_path, modes)
+        return open(self.__data_path(filename or self.filename), modes, newline="")
+
+    @property
+    def journal_filename(self):
+        """
+        Gets the name of the journal file that belongs to the storage file.
+        """
+        return Path(self.filename).stem + self.JOURNAL_SUFFIX
+
+    @property
+    def meta_filename(self):
+        """
+        Gets the name of the metadata file that belongs to the storage file.
+        """
+        return Path(self.filename).stem + self.META_SUFFIX
+
+    def __load_row(self, values, trusted: bool):
+        """
+        Creates an element from stored values.
+
+        Parameters:
+        values (Iterable): The stored values in the order of the fields.
+        trusted (bool): Whether the values were written by the assistant and need no validation.
+
+        Returns:
+        The created element.
+        """
+        if trusted or self.validation != "eager":
+            return self.load_type.from_trusted(*values)
+        return self.load_type(*values)
+
+    def __validate_loaded(self):
+        """
+        Validates the elements loaded from an untrusted source.
+        """
+        for element in self.data:
+            element.validate()
+
+    def __read_meta(self):
+        """
+        Reads the metadata of the CSV snapshot.
+
+        Returns:
+        dict: The metadata, empty if there is no valid metadata file.
+        """
+        try:
+            with self.__open_file("r", self.meta_filename) as meta_file:
+                return json.load(meta_file)
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def __write_meta(self, checksum: int, generation: int):
+        """
+        Writes the metadata of the CSV snapshot.
+
+        Parameters:
+        checksum (int): The CRC32 checksum of the snapshot content.
+        generation (int): The generation of the snapshot.
+        """
+        with self.__open_file("w", self.meta_filename + self.TEMP_SUFFIX) as meta_file:
+            json.dump(
+                {
+                    "format": self.FORMAT_VERSION,
+                    "checksum": checksum,
+                    "generation": generation,
+                    "next_id": self._next_id,
+                },
+                meta_file,
+            )
+            self.__sync_file(meta_file)
+        self.__replace_file(self.meta_filename)
+
+    def __sync_file(self, file):
+        """
+        Flushes a file and syncs its content to the disk unless the fsync policy is 'none'.
+
+        Parameters:
+        file: The opened file.
+        """
+        file.flush()
+        if self.fsync_policy != "none":
+            os.fsync(file.fileno())
+
+    def __replace_file(self, filename: str):
+        """
+        Atomically replaces a file with its temporary file.
+
+        With the 'full' fsync policy the data directory is synced, so the replacement survives a power loss.
+
+        Parameters:
+        filename (str): The name of the file to replace.
+        """
+        path = self.__data_path(filename)
+        os.replace(path.with_name(filename + self.TEMP_SUFFIX), path)
+        if self.fsync_policy == "full" and os.name == "posix":
+            directory = os.open(path.parent, os.O_RDONLY)
+            try:
+                os.fsync(directory)
+            finally:
+                os.close(directory)
+
+    def __load_snapshot(self, snapshot):
+        """
+        Loads the elements from the CSV snapshot.
+
+        The rows are loaded without validation first while the checksum of the file is computed. If the file
+        does not match the checksum in the metadata, the elements are validated afterwards.
+
+        Parameters:
+        snapshot: The opened snapshot file.
+        """
+        checksum = 0
+
+        def lines():
+            nonlocal checksum
+            for line in snapshot:
+                checksum = zlib.crc32(line.encode(), checksum)
+                yield line
+
+        reader = csv.reader(lines())
+        header = next(reader, None)
+        if header is None:
+            return
+        columns = [header.index(field) for field in self.fields]
+        for row in reader:
+            self.data.append(self.__load_row((row[column] for column in columns), False))
+
+        meta = self.__read_meta()
+        self.__generation = meta.get("generation", 0)
+        self.__persisted_next_id = meta.get("next_id", 0)
+        self.__snapshot_matched = (
+            meta.get("format") == self.FORMAT_VERSION and meta.get("checksum") == checksum
+        )
+        trusted = self.validation != "eager" and self.__snapshot_matched
+        if not trusted and self.validation != "eager":
+            self.__validate_loaded()
 
     def __enter__(self):
         """
         Enters the runtime context related to this object.
 
         Opens the file for reading and writing, and loads existing data into the list.
+        In journaled mode the journal is replayed on top of the loaded data.
+        With the 'sqlite' backend the data is loaded from the database table instead.
 
         Returns:
         PersistentStorage: The instance itself.
         """
-        try:
-            self.__dict_file_handle = self.__open_file("r+")
-            self.__csv_processor = csv.DictReader(self.__dict_file_handle)
-            for row in self.__csv_processor:
-                self.data.append(self.load_type(*(row[field] for field in self.fields)))
+        if self.backend == "sqlite":
+            self.__engine = SqliteEngine(
+                self.__data_path(SqliteEngine.DATABASE_FILENAME),
+                Path(self.filename).stem,
+                self.fields,
+                self.SQLITE_SYNCHRONOUS[self.fsync_policy],
+            )
+            self.__engine.open()
+            self.__load()
+            self._build_indexes()
+            self.__start_flusher()
+            return self
 
-        except FileNotFoundError:
-            self.__dict_file_handle = self.__open_file("w")
+        journal = self.__load()
+        self.__snapshot_opened = True
+        if self.journaled:
+            self.__journal_file_handle = self.__open_file("a", self.journal_filename)
+            if journal == "incomplete":
+                # New records must not follow a torn record or an unfinished transaction
+                self.checkpoint()
+            elif journal == "none":
+                self.__reset_journal()
+        else:
+            if journal != "none":
+                # The journal of a previous journaled session is merged into the snapshot
+                self.checkpoint()
+            self.__data_path(self.journal_filename).unlink(missing_ok=True)
+        self._build_indexes()
+        self.__start_flusher()
         return self
 
+    def __load(self):
+        """
+        Loads the elements from the database table, or from the CSV snapshot and its journal.
+
+        Returns:
+        str: The state of the replayed journal (see __replay_journal), 'none' with the 'sqlite' backend.
+        """
+        self.data = []
+        self.__journal_records = 0
+        if self.__engine:
+            trusted = self.__engine.format_version == self.FORMAT_VERSION
+            for row in self.__engine.load():
+                self.data.append(self.__load_row(row, trusted))
+            if not trusted and self.validation != "eager":
+                self.__validate_loaded()
+            if not trusted:
+                self.__engine.set_format_version(self.FORMAT_VERSION)
+            self.__build_slots(self.__engine.next_id or 0)
+            return "none"
+
+        self.__persisted_next_id = 0
+        try:
+            with self.__open_file("r") as snapshot:
+                self.__load_snapshot(snapshot)
+        except FileNotFoundError:
+            pass
+        self.__build_slots(self.__persisted_next_id)
+        return self.__replay_journal()
+
     def __exit__(self, *_):
         """
         Exits the runtime context related to this object.
 
-        Closes the file handle opened for reading and writing.
+        Stops the background writer, persists the changes not flushed yet and closes the journal or the database.
+        The changes of a transaction which was not committed are discarded.
+        """
+        self.__stop_flusher()
+        if self.__in_transaction:
+            self.__in_transaction = False
+            self.__pending_changes = []
+        self.flush()
+        if self.__engine:
+            self.__engine.close()
+            return
+        if self.__journal_file_handle:
+            self.__journal_file_handle.close()
+
+    def _build_indexes(self):
+        """
+        Builds the in-memory indexes for the loaded data.
+
+        Called after the data is loaded. Does nothing by default; storages with indexes override it.
+        """
+        pass
+
+    def __build_slots(self, persisted_next_id: int = 0):
+        """
+        Builds the ID to slot index for the loaded data.
+
+        In positional ID mode the elements are renumbered first if their IDs do not match their positions.
+        In stable ID mode the next ID is the persisted one, so the IDs of deleted elements, including the last
+        ones, are never given out again; it only follows the stored IDs if the persisted one is missing or older.
+
+        Parameters:
+        persisted_next_id (int, optional): The next ID persisted with the data. Defaults to 0.
+        """
+        if not self.stable_ids and any(
+            element.id != slot for slot, element in enumerate(self.data)
+        ):
+            self._update_ids()
+        self._tombstones = 0
+        self.__rebuild_slots()
+        self._next_id = max(self._slots, default=-1) + 1
+        if self.stable_ids:
+            self._next_id = max(self._next_id, persisted_next_id)
+
+    def __rebuild_slots(self):
+        """
+        Rebuilds the ID to slot index from the stored elements.
+        """
+        self._slots = {
+            element.id: slot
+            for slot, element in enumerate(self.data)
+            if element is not None
+        }
+
+    def _elements(self):
+        """
+        Iterates over the stored elements, skipping the tombstones of deleted ones.
+
+        Yields:
+        The stored elements in the order of their IDs.
+        """
+        return (element for element in self.data if element is not None)
+
+    def _count(self):
+        """
+        Gets the number of stored elements, not counting the tombstones of deleted ones.
+
+        Returns:
+        int: The number of stored elements.
+        """
+        return len(self.data) - self._tombstones
+
+    def _has_id(self, id: int):
+        """
+        Checks whether an element with the specified ID is stored.
+
+        Parameters:
+        id (int): The ID to be checked.
+
+        Returns:
+        bool: True if an element with the ID is stored, False otherwise.
+        """
+        return id in self._slots
+
+    def complete_ids(self, prefix: str, limit: int):
+        """
+        Finds the stored elements whose IDs start with the given digits, for the completion of ID arguments.
+
+        The IDs are not indexed: the candidates with the prefix are the ranges [prefix, prefix + 1) scaled by
+        the powers of ten, which are checked in increasing order, up to the next ID, until enough elements are
+        found.
+
+        Parameters:
+        prefix (str): The typed digits of the ID.
+        limit (int): The maximal number of results.
+
+        Returns:
+        list: The matching elements, the shorter IDs first.
+        """
+        if not prefix.isdigit() or (len(prefix) > 1 and prefix.startswith("0")):
+            return []
+        result = []
+        low = int(prefix)
+        high = low + 1
+        end = self._next_id
+        while low < end and len(result) < limit:
+            for id in range(low, min(high, end)):
+                if id in self._slots:
+                    result.append(self._get_element(id))
+                    if len(result) == limit:
+                        break
+            if not low:
+                break
+            low, high = low * 10, high * 10
+        return result
+
+    def _get_element(self, id: int):
+        """
+        Gets the element with the specified ID.
+
+        Parameters:
+        id (int): The ID of the element.
+
+        Returns:
+        The element with the ID.
+        """
+        return self.data[self._slots[id]]
+
+    def _allocate_id(self):
+        """
+        Allocates the ID for a new element.
+
+        Returns:
+        int: The next monotonic ID in stable ID mode, the next position otherwise.
+        """
+        if not self.stable_ids:
+            return len(self.data)
+        id = self._next_id
+        self._next_id += 1
+        return id
+
+    def _append_element(self, element):
+        """
+        Appends an element with a freshly allocated ID to the storage.
+
+        Parameters:
+        element: The element to be appended.
+        """
+        self._slots[element.id] = len(self.data)
+        self._next_id = max(self._next_id, element.id + 1)
+        self.data.append(element)
+
+    def _remove_element(self, id: int):
+        """
+        Removes the element with the specified ID from the storage.
+
+        In stable ID mode the slot of the element is replaced by a tombstone, and the storage is compacted once
+        tombstones take more than a half of the slots. Otherwise the element is removed and the following
+        elements are renumbered.
+
+        Parameters:
+        id (int): The ID of the element to be removed.
+
+        Returns:
+        The removed element.
+        """
+        slot = self._slots.pop(id)
+        element = self.data[slot]
+        if self.stable_ids:
+            self.data[slot] = None
+            self._tombstones += 1
+            if self._tombstones * 2 > len(self.data):
+                self.compact()
+        else:
+            self.data.pop(slot)
+            self._update_ids()
+            self.__rebuild_slots()
+        return element
+
+    def compact(self):
+        """
+        Reclaims the slots of deleted elements. IDs of the stored elements do not change.
+        """
+        if not self._tombstones:
+            return
+        self.data = list(self._elements())
+        self._tombstones = 0
+        self.__rebuild_slots()
+
+    def _update_ids(self):
+        """
+        Update the IDs of all elements in the storage to match their current positions.
+
+        This function is typically called after elements have been added or deleted, ensuring
+        that the IDs of the remaining elements reflect their sequential order in the storage.
+
+        Returns:
+        None
+        """
+        for id in range(len(self.data)):
+            self.data[id].id = id
+
+    def _stage_put(self, element):
         """
-        # For now we ignore possible errors on this step
-        self.__dict_file_handle.close()
+        Registers an added or changed element to be persisted by the next update.
+
+        The element is serialized immediately, so later changes of the element do not affect the staged record.
+
+        Parameters:
+        element: The element that was added or changed.
+        """
+        self.__pending_changes.append(["put", *map(str, self.__values(element))])
+
+    def _stage_delete(self, id: int):
+        """
+        Registers a deleted element to be persisted by the next update.
+
+        Parameters:
+        id (int): The ID the deleted element had.
+        """
+        self.__pending_changes.append(["del", str(id)])
+
+    def __apply_journal_record(self, op: str, values: list[str]):
+        """
+        Applies a single journal record to the loaded data.
+
+        Parameters:
+        op (str): The journal operation, either 'put' or 'del'.
+        values (list[str]): The operation arguments: field values for 'put', the element ID for 'del'.
+        """
+        if op == "put":
+            element = self.load_type(*values)
+            id = element.id
+            if self._has_id(id):
+                self.data[self._slots[id]] = element
+            else:
+                self._append_element(element)
+        elif op == "del":
+            self._remove_element(int(values[0]))
+
+    def __replay_journal(self):
+        """
+        Replays the journal on top of the data loaded from the CSV snapshot.
+
+        Records that were not completely written (e.g. because of a crash) are ignored, as well as the records
+        of a transaction without its commit record. A journal of another generation than the snapshot was
+        already merged into it by an interrupted checkpoint and is skipped. Journals without a generation
+        record belong to the first generation.
+
+        Returns:
+        str: 'none' if there is no journal of the snapshot, 'complete' if all its records were replayed,
+            'incomplete' if it ends with a torn record or an unfinished transaction.
+        """
+        transaction = None
+        try:
+            with self.__open_file("r", self.journal_filename) as journal:
+                for number, row in enumerate(csv.reader(journal)):
+                    if len(row) < 2 or row[-1] != self.JOURNAL_END_MARKER:
+                        return "incomplete"
+                    op = row[0]
+                    if op == self.JOURNAL_GENERATION:
+                        if number == 0 and self.__snapshot_matched and int(row[1]) != self.__generation:
+                            return "none"
+                        if len(row) > 3 and self.stable_ids:
+                            self._next_id = max(self._next_id, int(row[2]))
+                    elif op == self.JOURNAL_BEGIN:
+                        transaction = []
+                    elif op == self.JOURNAL_COMMIT:
+                        for op, *values in transaction:
+                            self.__apply_journal_record(op, values)
+                        self.__journal_records += len(transaction)
+                        transaction = None
+                    elif transaction is not None:
+                        transaction.append(row[:-1])
+                    else:
+                        self.__apply_journal_record(op, row[1:-1])
+                        self.__journal_records += 1
+        except FileNotFoundError:
+            return "none"
+        return "complete" if transaction is None else "incomplete"
+
+    def __reset_journal(self):
+        """
+        Empties the journal and starts it with the generation of the current snapshot and the next ID.
+        """
+        self.__journal_file_handle.truncate(0)
+        csv.writer(self.__journal_file_handle).writerow(
+            [self.JOURNAL_GENERATION, self.__generation, self._next_id, self.JOURNAL_END_MARKER]
+        )
+        self.__sync_file(self.__journal_file_handle)
+        self.__journal_records = 0
+
+    def __write_snapshot(self):
+        """
+        Rewrites the CSV file with all the elements of the storage and updates the snapshot metadata.
+
+        The snapshot is written to a temporary file, which replaces the CSV file once it is complete.
+        The metadata is replaced first: until the snapshot is replaced as well, the old snapshot does not
+        match it, and it is only validated again instead of being mistaken for the new one.
+        """
+        with self.__open_file("w", self.filename + self.TEMP_SUFFIX) as snapshot:
+            output = _ChecksumWriter(snapshot)
+            writer = csv.writer(output)
+            writer.writerow(self.fields)
+            writer.writerows(map(self.__values, self._elements()))
+            self.__sync_file(snapshot)
+        self.__generation += 1
+        self.__write_meta(output.checksum, self.__generation)
+        self.__replace_file(self.filename)
+        self.__snapshot_matched = True
+
+    def checkpoint(self):
+        """
+        Rebuilds the CSV snapshot from the current data and empties the journal.
+        Tombstones of deleted elements are reclaimed as well.
+
+        With the 'sqlite' backend all the rows of the database table are replaced by the current data.
+        The staged changes are dropped, because the rebuilt data already contains them.
+
+        Raises:
+        TransactionError: If a transaction is open.
+        """
+        with self.__write_lock, self.__lock:
+            if self.__in_transaction:
+                raise TransactionError("Error: The storage can not be checkpointed during a transaction.")
+            self.__pending_changes = []
+            self.__updates = 0
+            self.compact()
+            if self.__engine:
+                self.__engine.replace_all(
+                    (list(map(str, self.__values(element))) for element in self._elements()),
+                    self._next_id if self.stable_ids else None,
+                )
+                return
+            if not self.__snapshot_opened:
+                return
+            self.__write_snapshot()
+            if self.__journal_file_handle:
+                self.__reset_journal()
+
+    def __append_journal(self, changes: list):
+        """
+        Appends changes to the journal, or runs a checkpoint instead when the journal would grow too long.
+
+        The records are written with a single unbuffered write. If the write or the sync fails, the journal is
+        truncated back to its previous end, so the changes can be appended again by the next flush without
+        duplicating the records written so far. If even the truncation fails, the next flush runs a checkpoint
+        instead, because records appended after a torn one would never be replayed.
+
+        Parameters:
+        changes (list[list[str]]): The staged changes.
+        """
+        if self.__journal_damaged or (
+            self.__journal_records + len(changes) >= max(self.checkpoint_interval, self._count())
+        ):
+            # The snapshot already holds the changes, e.g. of a bulk import, so they are not journaled first
+            self.checkpoint()
+            self.__journal_damaged = False
+            return
+        data = self.__csv_lines([*change, self.JOURNAL_END_MARKER] for change in changes)
+        data = data.encode(self.__journal_file_handle.encoding)
+        self.__journal_file_handle.flush()
+        descriptor = self.__journal_file_handle.fileno()
+        end = os.lseek(descriptor, 0, os.SEEK_END)
+        try:
+            written = 0
+            while written < len(data):
+                written += os.write(descriptor, data[written:])
+            if self.fsync_policy != "none":
+                os.fsync(descriptor)
+        except BaseException:
+            try:
+                os.ftruncate(descriptor, end)
+            except OSError:
+                self.__journal_damaged = True
+            raise
+        self.__journal_records += len(changes)
+        # Rebuilding the snapshot costs as much as the whole storage, so the journal is allowed to grow
+        # as long as the storage to keep the cost per change constant
+        if self.__journal_records >= max(self.checkpoint_interval, self._count()):
+            self.checkpoint()
+
+    def flush(self):
+        """
+        Persists the staged changes.
+
+        In journaled mode the staged changes are appended to the journal, with the 'sqlite' backend they are
+        written to the database in a single transaction. Otherwise the CSV file is rewritten once.
+        Only the CSV rewrite holds the data lock while writing; updates may go on during the other writes.
+        Nothing is written while a transaction is open.
+        """
+        with self.__write_lock:
+            with self.__lock:
+                if self.__in_transaction:
+                    return
+                changes, self.__pending_changes = self.__pending_changes, []
+                self.__updates = 0
+                if not changes:
+                    return
+                next_id = self._next_id if self.stable_ids else None
+                if not self.__engine and not self.__journal_file_handle:
+                    if self.__snapshot_opened and self._count():
+                        self.__write_snapshot()
+                    return
+            try:
+                if self.__engine:
+                    self.__engine.apply(changes, renumber=not self.stable_ids, next_id=next_id)
+                else:
+                    self.__append_journal(changes)
+            except Exception:
+                # Nothing is lost: the journal or the database holds none of the changes, which are written
+                # again by the next flush
+                with self.__lock:
+                    self.__pending_changes[:0] = changes
+                raise
+
+    @staticmethod
+    def __csv_lines(rows):
+        """
+        Formats rows as CSV lines.
+
+        Parameters:
+        rows (Iterable[tuple]): The values of every row.
+
+        Returns:
+        str: The joined lines.
+        """
+        output = io.StringIO()
+        csv.writer(output).writerows(rows)
+        return output.getvalue()
+
+    def __jsonl_lines(self, elements: list):
+        """
+        Formats elements as JSON lines, one object with the stored values per element.
+
+        The lines are filled into a template with the quoted field names, which gives the same output as
+        encoding a dictionary per element in about half the time.
+
+        Parameters:
+        elements (list): The elements.
+
+        Returns:
+        str: The joined lines.
+        """
+        template = "{{" + ", ".join(f"{quote(field)}: {{}}" for field in self.fields) + "}}\n"
+        return "".join(
+            template.format(*[value if isinstance(value, int) else quote(str(value)) for value in self.__values(element)])
+            for element in elements
+        )
+
+    @classmethod
+    def file_format(cls, path):
+        """
+        Gets the format of a data file from its extension, ignoring a '.gz' suffix.
+
+        Parameters:
+        path (str | Path): The path of the file.
+
+        Returns:
+        str: One of the values of FILE_FORMATS, or None if the extension is unknown.
+        """
+        path = Path(path)
+        if path.suffix.lower() == ".gz":
+            path = path.with_suffix("")
+        return cls.FILE_FORMATS.get(path.suffix.lower())
+
+    def _export_frame(self, export_format: str, **options):
+        """
+        Gets the text written before and after the elements of an export. Subclasses exporting more formats
+        extend it together with _export_lines().
+
+        Parameters:
+        export_format (str): The format of the file, one of the values of FILE_FORMATS.
+        **options: The format options passed to export().
+
+        Returns:
+        tuple[str, str]: The text before and after the elements.
+        """
+        if export_format == "csv":
+            return self.__csv_lines([self.fields]), ""
+        return "", ""
+
+    def _export_lines(self, export_format: str, elements: list, **options):
+        """
+        Formats a page of exported elements.
+
+        Parameters:
+        export_format (str): The format of the file, one of the values of FILE_FORMATS.
+        elements (list): The elements.
+        **options: The format options passed to export().
+
+        Returns:
+        str: The joined lines.
+        """
+        if export_format == "csv":
+            return self.__csv_lines(map(self.__values, elements))
+        return self.__jsonl_lines(elements)
+
+    def export(self, path: str, elements=None, **options):
+        """
+        Writes elements to a CSV file with a header or to a JSON lines file, or to another of the FILE_FORMATS
+        of the subclass, by the extension of the path. A '.gz' suffix after the extension compresses the file with gzip.
+
+        The elements are serialized and written EXPORT_PAGE_SIZE at a time through a buffer of
+        EXPORT_BUFFER_SIZE bytes, so the memory used does not depend on their number. The file is written under
+        a temporary name and renamed once complete, so readers never see a partial export.
+
+        Parameters:
+        path (str): The path of the file, e.g. 'contacts.jsonl.gz'. A leading ~ is expanded.
+        elements (Iterable, optional): The elements to export. Defaults to all the stored elements.
+        **options: Options of the format, passed to _export_frame() and _export_lines().
+
+        Raises:
+        InvalidDataFileError: If the format of the file is unknown or the file can not be written.
+
+        Returns:
+        int: The number of exported elements.
+        """
+        path = Path(path).expanduser()
+        compressed = path.suffix.lower() == ".gz"
+        export_format = self.file_format(path)
+        if export_format is None:
+            raise InvalidDataFileError(
+                f"Error: Data can be exported to {', '.join(self.FILE_FORMATS)} files only, optionally with '.gz'."
+            )
+        elements = iter(self._elements() if elements is None else elements)
+        count = 0
+        temporary = path.with_name(path.name + self.TEMP_SUFFIX)
+        try:
+            with open(temporary, "wb", buffering=self.EXPORT_BUFFER_SIZE) as file:
+                stream = file
+                if compressed:
+                    # Imported here, so the startup does not pay for the compression library most runs never use
+                    import gzip
+
+                    stream = gzip.GzipFile(fileobj=file, mode="wb", compresslevel=self.EXPORT_COMPRESSION)
+                header, footer = self._export_frame(export_format, **options)
+                stream.write(header.encode())
+                for page in iter(lambda: list(islice(elements, self.EXPORT_PAGE_SIZE)), []):
+                    stream.write(self._export_lines(export_format, page, **options).encode())
+                    count += len(page)
+                stream.write(footer.encode())
+                if compressed:
+                    stream.close()
+                self.__sync_file(file)
+            os.replace(temporary, path)
+        except OSError as e:
+            temporary.unlink(missing_ok=True)
+            raise InvalidDataFileError(f"Error: The file {path} can not be written: {e.strerror}.")
+        except BaseException:
+            temporary.unlink(missing_ok=True)
+            raise
+        return count
+
+    @property
+    def in_transaction(self):
+        """
+        Tells whether a transaction is open.
+        """
+        return self.__in_transaction
+
+    def begin(self):
+        """
+        Opens a transaction. The changes made until commit() or rollback() are only kept in memory.
+
+        The changes made before are persisted first, so the transaction starts from the persisted data.
+
+        Raises:
+        TransactionError: If a transaction is already open.
+        """
+        with self.__write_lock:
+            if self.__in_transaction:
+                raise TransactionError("Error: A transaction is already open.")
+            self.flush()
+            self.__in_transaction = True
+
+    def commit(self):
+        """
+        Closes the open transaction and persists its changes with a single write.
+
+        Raises:
+        TransactionError: If no transaction is open.
+        """
+        with self.__write_lock:
+            with self.__lock:
+                if not self.__in_transaction:
+                    raise TransactionError("Error: No transaction is open.")
+                self.__in_transaction = False
+                if len(self.__pending_changes) > 1:
+                    self.__pending_changes = [
+                        [self.JOURNAL_BEGIN],
+                        *self.__pending_changes,
+                        [self.JOURNAL_COMMIT],
+                    ]
+            self.flush()
+
+    def rollback(self):
+        """
+        Closes the open transaction, discards its changes and loads the persisted data again.
+
+        Raises:
+        TransactionError: If no transaction is open.
+        """
+        with self.__write_lock, self.__lock:
+            if not self.__in_transaction:
+                raise TransactionError("Error: No transaction is open.")
+            self.__in_transaction = False
+            self.__pending_changes = []
+            self.__updates = 0
+            self.__load()
+            self._build_indexes()
+
+    @contextmanager
+    def transaction(self):
+        """
+        A context manager running its block in a transaction.
+
+        The transaction is committed when the block finishes, and rolled back if the block raises an exception.
+
+        Yields:
+        PersistantStorage: The storage itself.
+        """
+        self.begin()
+        try:
+            yield self
+        except BaseException:
+            self.rollback()
+            raise
+        self.commit()
+
+    def __start_flusher(self):
+        """
+        Starts the background writer of the 'interval' and 'count' write policies.
+        """
+        if self.write_policy not in ("interval", "count"):
+            return
+        self.__closing = False
+        self.__flusher = threading.Thread(
+            target=self.__run_flusher, name=f"{self.filename} writer", daemon=True
+        )
+        self.__flusher.start()
+
+    def __run_flusher(self):
+        """
+        The loop of the background writer. It flushes on every interval, or when woken up by the updates.
+        """
+        timeout = self.write_policy_value / 1000 if self.write_policy == "interval" else None
+        while not self.__closing:
+            self.__flusher_wakeup.wait(timeout)
+            self.__flusher_wakeup.clear()
+            try:
+                self.flush()
+            except Exception:
+                # The changes stay staged; the final flush on exit reports the error
+                pass
+
+    def __stop_flusher(self):
+        """
+        Stops the background writer and waits for the write in progress.
+        """
+        if not self.__flusher:
+            return
+        self.__closing = True
+        self.__flusher_wakeup.set()
+        self.__flusher.join()
+        self.__flusher = None
 
     def update(data_change_func):
         """
         A decorator for updating the CSV file after a data change.
 
-        This decorator ensures that any changes made to the data are reflected in the CSV file.
+        This decorator ensures that any changes made to the data are reflected in the CSV file
+        according to the write policy. The change itself is done under the data lock.
 
         Parameters:
         data_change_func (function): The function that changes the data.
         """
 
         def wrapper(self, *args):
-            result = data_change_func(self, *args)
-            if self.__dict_file_handle and self.data:
-                self.__dict_file_handle.truncate(0)
-                self.__dict_file_handle.seek(0)
-                self.__csv_processor = csv.DictWriter(
-                    self.__dict_file_handle, fieldnames=self.fields
-                )
-                self.__csv_processor.writeheader()
-                for element in self.data:
-                    self.__csv_processor.writerow(element.data)
+            with self.__lock:
+                result = data_change_func(self, *args)
+                self.__updates += 1
+                updates = self.__updates
+            if self.write_policy == "immediate":
+                self.flush()
+            elif self.write_policy == "count" and updates >= self.write_policy_value:
+                self.__flusher_wakeup.set()
             return result
 
         return wrapper
 
 
+class _ChecksumWriter:
+    """
+    A file wrapper computing the CRC32 checksum of the text written through it.
+
+    Attributes:
+        file: The wrapped file object.
+        checksum (int): The checksum of the text written so far.
+    """
+
+    def __init__(self, file):
+        """
+        Initializes a new _ChecksumWriter instance.
+
+        Parameters:
+        file: The file object to write to.
+        """
+        self.file = file
+        self.checksum = 0
+
+    def write(self, text: str):
+        """
+        Writes the text to the wrapped file and updates the checksum.
+
+        Parameters:
+        text (str): The text to be written.
+        """
+        self.checksum = zlib.crc32(text.encode(), self.checksum)
+        return self.file.write(text)
+
+
 if __name__ == "__main__":
     pass
@@ -0,0 +1,276 @@
+import re
+
+VCARD_VERSIONS = ("3.0", "4.0")
+LINE_LENGTH = 75
+CARD_PROPERTIES = frozenset(("FN", "N", "TEL", "EMAIL", "BDAY", "ADR"))
+TEXT_ESCAPES = str.maketrans({"\\": "\\\\", ";": "\\;", ",": "\\,", "\n": "\\n"})
+ESCAPED = re.compile(r"\\(.)")
+ESCAPE_OR_SEPARATOR = re.compile(r"\\.|;")
+PHONE_SEPARATORS = re.compile(r"[\s().-]")
+BIRTHDAY_DATE = re.compile(r"([0-9]{4})-?([0-9]{2})-?([0-9]{2})(?:T.*)?")
+CALENDAR_HEADER = "BEGIN:VCALENDAR\r\nVERSION:2.0\r\nPRODID:-//personal-assistant//Birthdays//EN\r\nCALSCALE:GREGORIAN\r\n"
+CALENDAR_FOOTER = "END:VCALENDAR\r\n"
+
+
+def _escape(text: str):
+    """
+    Escapes a text value of a vCard or an iCalendar property.
+    """
+    return text.translate(TEXT_ESCAPES)
+
+
+def _unescape(text: str):
+    """
+    Replaces the escaped characters of a text value, e.g. '\\,' and '\\n', by the characters themselves.
+    """
+    if "\\" not in text:
+        return text
+    return ESCAPED.sub(lambda match: "\n" if match.group(1) in "nN" else match.group(1), text)
+
+
+def _components(value: str):
+    """
+    Splits a structured value, e.g. of the N or ADR property, into its unescaped components.
+
+    Parameters:
+    value (str): The value, with the components separated by unescaped semicolons.
+
+    Returns:
+    list[str]: The components.
+    """
+    components, start = [], 0
+    for match in ESCAPE_OR_SEPARATOR.finditer(value):
+        if match.group() == ";":
+            components.append(_unescape(value[start : match.start()]))
+            start = match.end()
+    components.append(_unescape(value[start:]))
+    return components
+
+
+def _fold(line: str):
+    """
+    Folds a content line longer than LINE_LENGTH into continuation lines starting with a space, and ends it
+    with CRLF. The values written are ASCII, so the characters are the octets the standards count.
+    """
+    if len(line) <= LINE_LENGTH:
+        return line + "\r\n"
+    parts = [line[:LINE_LENGTH]]
+    parts += [line[start : start + LINE_LENGTH - 1] for start in range(LINE_LENGTH, len(line), LINE_LENGTH - 1)]
+    return "\r\n ".join(parts) + "\r\n"
+
+
+def _unfold(lines):
+    """
+    Joins the continuation lines to the content lines they continue.
+
+    Parameters:
+    lines (Iterable[str]): The physical lines, e.g. an opened file.
+
+    Yields:
+    str: The logical content lines without the line endings.
+    """
+    current = None
+    for line in lines:
+        line = line.rstrip("\r\n")
+        if current is not None and line[:1] in (" ", "\t"):
+            current += line[1:]
+            continue
+        if current:
+            yield current
+        current = line
+    if current:
+        yield current
+
+
+def _parse_line(line: str):
+    """
+    Splits a content line into its property name, parameters and value.
+
+    Parameters:
+    line (str): The content line, e.g. 'item1.TEL;TYPE=CELL,pref:+380501234567'.
+
+    Returns:
+    tuple: The upper-case name without the group, the list of the parameters as written and the raw value,
+        or None if the line has no value.
+    """
+    colon = line.find(":")
+    quote = line.find('"', 0, colon)
+    # Quoted parameter values may contain colons
+    while colon != -1 and quote != -1:
+        closing = line.find('"', quote + 1)
+        if closing == -1:
+            return None
+        colon = line.find(":", closing + 1)
+        quote = line.find('"', closing + 1, colon)
+    if colon == -1:
+        return None
+    name, *parameters = line[:colon].split(";")
+    return name.rpartition(".")[2].upper(), parameters, line[colon + 1 :]
+
+
+def _is_preferred(parameters: list):
+    """
+    Tells whether the parameters of a property mark it as preferred: 'TYPE=pref' in vCard 3.0, 'PREF=n' in
+    vCard 4.0 or a bare 'PREF'.
+    """
+    for parameter in parameters:
+        name, _, values = parameter.upper().partition("=")
+        if name == "PREF" or (name == "TYPE" and "PREF" in values.replace('"', "").split(",")):
+            return True
+    return False
+
+
+def _preferred_value(properties: list):
+    """
+    Gets the value of the preferred property of several, e.g. of the phones of a card, or of the first one.
+    """
+    if not properties:
+        return ""
+    for parameters, value in properties:
+        if _is_preferred(parameters):
+            return value
+    return properties[0][1]
+
+
+def _card_values(card: dict):
+    """
+    Maps the properties of a vCard to the values of a contact.
+
+    The name is the formatted name (FN), or is made of the given, additional and family names (N) if FN is
+    missing. Of several phones, emails and addresses the preferred one, or the first one, is taken. Phones
+    lose the 'tel:' prefix and the separators, birthdays are converted to DD.MM.YYYY, and the components of
+    an address are joined with commas. Birthdays without a year can not be stored and are left out.
+
+    Parameters:
+    card (dict): The lists of (parameters, value) tuples of the properties of the card by their names.
+
+    Returns:
+    dict: The values of the contact by the field names, as strings still to be validated.
+    """
+    name = _unescape(_preferred_value(card.get("FN"))).strip()
+    if not name and card.get("N"):
+        family, given, additional, *_ = _components(card["N"][0][1]) + ["", ""]
+        name = " ".join(part.strip() for part in (given, additional, family) if part.strip())
+    phone = _preferred_value(card.get("TEL")).strip()
+    if phone[:4].lower() == "tel:":
+        phone = phone[4:].partition(";")[0]
+    birthday = _preferred_value(card.get("BDAY")).strip()
+    match = BIRTHDAY_DATE.fullmatch(birthday)
+    if match:
+        year, month, day = match.groups()
+        birthday = f"{day}.{month}.{year}"
+    elif birthday.startswith("--"):
+        birthday = ""
+    address = _components(_preferred_value(card.get("ADR")))
+    return {
+        "name": name,
+        "phone": PHONE_SEPARATORS.sub("", phone),
+        "email": _unescape(_preferred_value(card.get("EMAIL"))).strip(),
+        "birthday": birthday,
+        "address": ", ".join(" ".join(component.split()) for component in address if component.strip()),
+    }
+
+
+def read_vcards(lines):
+    """
+    Parses vCards 3.0 or 4.0 one at a time, so a file of any size is read with constant memory.
+
+    Only the properties mapped to the contact fields are kept (see _card_values). Lines outside of the cards
+    and lines without a value are ignored. A card cut off by the end of the file is still returned.
+
+    Parameters:
+    lines (Iterable[str]): The lines of the vCard file, e.g. the opened file.
+
+    Yields:
+    dict: The values of the contact of every card by the field names.
+    """
+    card = None
+    for line in _unfold(lines):
+        parsed = _parse_line(line)
+        if parsed is None:
+            continue
+        name, parameters, value = parsed
+        if name == "BEGIN" and value.strip().upper() == "VCARD":
+            card = {}
+        elif card is None:
+            continue
+        elif name == "END" and value.strip().upper() == "VCARD":
+            yield _card_values(card)
+            card = None
+        elif name in CARD_PROPERTIES:
+            card.setdefault(name, []).append((parameters, value))
+    if card is not None:
+        yield _card_values(card)
+
+
+def format_vcard(name: str, phone: str, email: str = "", birthday: str = "", address: str = "", version: str = "3.0"):
+    """
+    Formats a contact as a vCard.
+
+    The last word of the name is written as the family name and the others as the given names. The address
+    is written as the street of a home address.
+
+    Parameters:
+    name (str): The name of the contact.
+    phone (str): The phone number of the contact.
+    email (str, optional): The email address of the contact.
+    birthday (str, optional): The birthday of the contact, as DD.MM.YYYY.
+    address (str, optional): The address of the contact.
+    version (str, optional): One of the VCARD_VERSIONS. Defaults to '3.0', which phones read best.
+
+    Returns:
+    str: The lines of the card, ending with CRLF.
+    """
+    given, _, family = name.rpartition(" ")
+    if not given:
+        given, family = family, ""
+    lines = [
+        "BEGIN:VCARD",
+        f"VERSION:{version}",
+        f"FN:{_escape(name)}",
+        f"N:{_escape(family)};{_escape(given)};;;",
+    ]
+    legacy = version == "3.0"
+    lines.append(f"TEL;TYPE=CELL:{phone}" if legacy else f"TEL;VALUE=uri;TYPE=cell:tel:{phone}")
+    if email:
+        lines.append(f"EMAIL;TYPE=INTERNET:{email}" if legacy else f"EMAIL:{email}")
+    if birthday:
+        day, month, year = birthday.split(".")
+        separator = "-" if legacy else ""
+        lines.append(f"BDAY:{year}{separator}{month:0>2}{separator}{day:0>2}")
+    if address:
+        lines.append(f"ADR;TYPE={'HOME' if legacy else 'home'}:;;{_escape(address)};;;;")
+    lines.append("END:VCARD")
+    return "".join(map(_fold, lines))
+
+
+def format_birthday_event(uid: str, name: str, birthday: str, stamp: str):
+    """
+    Formats the birthday of a contact as an iCalendar event recurring every year from the date of birth.
+
+    February 29 recurs on the 60th day of the year, which is March 1 in non-leap years, as in the upcoming
+    birthdays of the contacts book.
+
+    Parameters:
+    uid (str): The unique identifier of the event, which is kept between exports so calendars update the
+        event instead of adding another one.
+    name (str): The name of the contact.
+    birthday (str): The birthday of the contact, as DD.MM.YYYY.
+    stamp (str): The time of the export in UTC, e.g. '20240101T120000Z'.
+
+    Returns:
+    str: The lines of the event, ending with CRLF.
+    """
+    day, month, year = birthday.split(".")
+    rule = "FREQ=YEARLY;BYYEARDAY=60" if (int(day), int(month)) == (29, 2) else "FREQ=YEARLY"
+    lines = [
+        "BEGIN:VEVENT",
+        f"UID:{uid}",
+        f"DTSTAMP:{stamp}",
+        f"DTSTART;VALUE=DATE:{year}{month:0>2}{day:0>2}",
+        f"RRULE:{rule}",
+        f"SUMMARY:{_escape(name)}'s birthday",
+        "TRANSP:TRANSPARENT",
+        "END:VEVENT",
+    ]
+    return "".join(map(_fold, lines))
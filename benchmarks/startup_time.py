@@ -0,0 +1,76 @@
+"""
+Startup benchmark for the assistant entry point.
+
+Imports assistant.main in fresh interpreters with `python -X importtime` and reports the median cumulative
+import time of assistant.main together with the UI and storage libraries it pulled in. The run fails when
+the fastest run exceeds the startup budget: a busy machine slows down the median of every run, while the
+fastest one still shows what the imports cost.
+
+The budget assumes CPython 3.11 on an otherwise idle machine with a warm file cache. About half of the
+import time is argparse and pathlib, which the entry point needs to parse its options and to find the data
+directory.
+
+Usage:
+    python benchmarks/startup_time.py [runs]
+
+Result (CPython 3.11, median of 15 runs, warm file cache):
+    before (rich and prompt_toolkit imported eagerly):   ~225 ms for assistant.main
+        prompt_toolkit ~125 ms, rich.console ~45 ms, rich.table ~7 ms, sqlite3 ~2 ms
+    after (UI libraries and sqlite3 imported on first use): ~45 ms for assistant.main
+        none of them is imported; batch runs never load them, the interactive session loads them at its start
+    now (gzip imported on first use too): ~48 ms median, ~40 ms fastest for assistant.main
+        argparse ~18 ms (mostly re, which the storages use anyway), pathlib ~8 ms, datetime ~3 ms
+"""
+import re
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+BUDGET_MS = 60
+MODULE = "assistant.main"
+WATCHED = ("rich.console", "rich.table", "prompt_toolkit", "sqlite3", "gzip", "argparse", "pathlib")
+LINE_PATTERN = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def measure():
+    """
+    Imports the module once in a fresh interpreter.
+
+    Returns:
+        dict: The cumulative import time in microseconds of every top-level imported package.
+    """
+    output = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {MODULE}"],
+        cwd=Path(__file__).resolve().parent.parent,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stderr
+    times = {}
+    for match in LINE_PATTERN.finditer(output):
+        _, cumulative, _, name = match.groups()
+        # A package can show up on several nesting levels, the outermost entry holds its total
+        times[name] = max(times.get(name, 0), int(cumulative))
+    return times
+
+
+def main(runs: int):
+    samples = [measure() for _ in range(runs)]
+    totals = [sample.get(MODULE, 0) / 1000 for sample in samples]
+    fastest = min(totals)
+    print(
+        f"{MODULE}: {statistics.median(totals):.1f} ms median, {fastest:.1f} ms fastest "
+        f"of {runs} runs (budget {BUDGET_MS} ms for the fastest)"
+    )
+    for name in WATCHED:
+        times = [sample[name] for sample in samples if name in sample]
+        if times:
+            print(f"    {name}: {statistics.median(times) / 1000:.1f} ms")
+        else:
+            print(f"    {name}: not imported")
+    return 0 if fastest <= BUDGET_MS else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main(int(sys.argv[1]) if len(sys.argv) > 1 else 9))
@@ -0,0 +1,87 @@
+"""
+Write durability benchmark for the storage.
+
+Adds contacts one by one with the 'immediate' write policy, so every change is written before the next one,
+and reports the throughput of every fsync policy for the journaled CSV storage, the CSV snapshot storage
+(the whole file is rewritten on every change) and the SQLite storage. The storage files are kept in a
+temporary home directory, which should be on the disk to measure (see --dir).
+
+Usage:
+    python benchmarks/write_durability.py [--changes N] [--records N] [--dir DIR]
+
+Result (CPython 3.11, ext4 on a virtio disk, median of 3 runs, 500 changes on top of 1000 records):
+    journal    none ~12000/s   data ~3900/s   full ~4100/s
+    snapshot   none   ~210/s   data  ~190/s   full  ~160/s
+    sqlite     none  ~5100/s   data ~1100/s   full ~1000/s
+    The fsync of every journal record costs two thirds of the journal throughput; 'full' only adds a sync of
+    the directory at the checkpoints, so the difference to 'data' is noise. The deferred write policies ('interval:N', 'count:N') sync once per batch.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from assistant.contacts import ContactsBook  # noqa: E402
+from assistant.storage import PersistantStorage  # noqa: E402
+
+STORAGES = {
+    "journal": {"backend": "csv", "journaled": True, "stable_ids": True},
+    "snapshot": {"backend": "csv", "stable_ids": True},
+    "sqlite": {"backend": "sqlite", "stable_ids": True},
+}
+
+
+def contact_name(number: int):
+    """
+    Gets a valid, unique contact name for a number. Names may only contain letters.
+    """
+    return "Contact " + "".join("abcdefghij"[int(digit)] for digit in str(number))
+
+
+def measure(storage_options: dict, records: int, changes: int):
+    """
+    Measures the throughput of single changes on top of a prefilled storage.
+
+    Parameters:
+    storage_options (dict): The keyword arguments for ContactsBook.
+    records (int): The number of contacts stored before the measurement.
+    changes (int): The number of measured changes.
+
+    Returns:
+    float: The number of changes per second.
+    """
+    prefill = {key: value for key, value in storage_options.items() if key != "fsync_policy"}
+    with ContactsBook(write_policy="exit", fsync_policy="none", **prefill) as book:
+        for number in range(records):
+            book.add_contact(contact_name(number), f"+{number:012d}")
+    with ContactsBook(**storage_options) as book:
+        start = time.perf_counter()
+        for number in range(records, records + changes):
+            book.add_contact(contact_name(number), f"+{number:012d}")
+        elapsed = time.perf_counter() - start
+    return changes / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--changes", type=int, default=500, help="the number of measured changes")
+    parser.add_argument("--records", type=int, default=1000, help="the number of prefilled contacts")
+    parser.add_argument("--dir", help="the directory for the temporary storage files")
+    options = parser.parse_args()
+
+    for name, storage_options in STORAGES.items():
+        results = []
+        for policy in PersistantStorage.FSYNC_POLICIES:
+            with tempfile.TemporaryDirectory(dir=options.dir) as home:
+                os.environ["HOME"] = home
+                rate = measure({**storage_options, "fsync_policy": policy}, options.records, options.changes)
+            results.append(f"{policy} {rate:8.0f}/s")
+        print(f"{name:<10} " + "   ".join(results))
+
+
+if __name__ == "__main__":
+    main()
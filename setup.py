@@ -25,6 +25,10 @@ setup(
     entry_points={
         "console_scripts": [
             "personal-assistant=assistant.main:run",
+            "personal-assistant-migrate=assistant.main:migrate",
+            "personal-assistant-daemon=assistant.daemon:run_daemon",
+            "personal-assistant-client=assistant.client:run_client",
+            "personal-assistant-api=assistant.api:run_api",
         ],
     },
 )